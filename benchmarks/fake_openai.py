@@ -0,0 +1,216 @@
+"""
+Local stand-in for the chat completions API, for benchmarks that must not touch the network.
+
+Point the OpenAI client at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1. Responses are
+canned but shaped by the request: extraction prompts get one rule per numbered clause in the
+text, classification prompts get a label per numbered rule and refinement prompts get one
+rule per numbered statement. Latency, jitter and error rate are configurable. Answers longer
+than max_completion_tokens are cut off with finish_reason "length", and requests with
+stream=True are answered with server-sent events.
+
+    python -m benchmarks.fake_openai --port 8765 --latency 0.8 --error-rate 0.02
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CATEGORIES = ["Marketing", "Gambling", "Legal", "Compliance"]
+CLAUSE = re.compile(r"(?m)^(\d+(?:\.\d+)*[a-z]?)\s+(.+)$")
+NUMBERED = re.compile(r"(?m)^(\d+)\.\s+(.+)$")
+# Every COMPLEX_EVERY-th extracted rule is long enough to be sent to the refinement pass
+COMPLEX_EVERY = 10
+
+
+class FakeOpenAI:
+    def __init__(self, latency=0.5, jitter=0.2, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
+            self.errors = 0
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "errors": self.errors}
+
+    def _draw(self):
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+            return delay, self._random.random() < self.error_rate
+
+    def complete(self, request):
+        model = request.get("model", "")
+        with self._lock:
+            self.calls[model] = self.calls.get(model, 0) + 1
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            return 429, {"error": {"message": "Rate limit reached", "type": "requests"}}
+        prompt = request["messages"][-1]["content"]
+        answer = self._answer(prompt)
+        content = answer if isinstance(answer, str) else json.dumps(answer)
+        finish_reason = "stop"
+        max_completion_tokens = request.get("max_completion_tokens")
+        if max_completion_tokens and len(content) > max_completion_tokens * 4:
+            content = content[: max_completion_tokens * 4]
+            finish_reason = "length"
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return 200, {
+            "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _answer(self, prompt):
+        if prompt.startswith("Classify the following rule"):
+            return CATEGORIES[len(prompt) % len(CATEGORIES)]
+        if prompt.startswith("Classify each of the following numbered rules"):
+            rules = NUMBERED.findall(prompt.split("Rules:\n", 1)[-1])
+            return {n: CATEGORIES[int(n) % len(CATEGORIES)] for n, _ in rules}
+        if "\n\nStatements:\n" in prompt:
+            statements = NUMBERED.findall(prompt.split("\n\nStatements:\n", 1)[-1])
+            return [_rule(text[:200], int(n), source=int(n)) for n, text in statements]
+        text = prompt.split("\n\nText:\n", 1)[-1]
+        rules = []
+        for i, (number, body) in enumerate(CLAUSE.findall(text), start=1):
+            if i % COMPLEX_EVERY == 0:
+                body = " and ".join([body] * 4)
+            rules.append(_rule(f"{number}: {body}", i))
+        return rules
+
+
+def _rule(rule_text, n, source=None):
+    rule = {
+        "rule_text": rule_text,
+        "context": "Synthetic rule produced by the benchmark stub.",
+        "tags": ["benchmark", "synthetic", f"clause-{n % 7}"],
+        # Leave some rules uncategorised so the classification path is exercised
+        "category": CATEGORIES[n % len(CATEGORIES)] if n % 5 else "",
+    }
+    if source is not None:
+        rule["source"] = source
+    return rule
+
+
+def stream_events(completion, include_usage=False, piece_size=64):
+    """Split a completion into the chat.completion.chunk events of a streamed answer."""
+    choice = completion["choices"][0]
+    content = choice["message"]["content"]
+
+    def chunk(delta, finish_reason=None):
+        return {
+            "id": completion["id"],
+            "object": "chat.completion.chunk",
+            "created": completion["created"],
+            "model": completion["model"],
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    yield chunk({"role": "assistant", "content": ""})
+    for start in range(0, len(content), piece_size):
+        yield chunk({"content": content[start : start + piece_size]})
+    yield chunk({}, choice["finish_reason"])
+    if include_usage:
+        yield {**chunk({}), "choices": [], "usage": completion["usage"]}
+
+
+def _handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After-Ms", "200")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_stream(self, events):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            for event in events:
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send(200, fake.stats())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            request = json.loads(
+                self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}"
+            )
+            if self.path == "/reset":
+                fake.reset()
+                self._send(200, {})
+            elif self.path.endswith("/chat/completions"):
+                status, payload = fake.complete(request)
+                if status == 200 and request.get("stream"):
+                    include_usage = (request.get("stream_options") or {}).get(
+                        "include_usage", False
+                    )
+                    self._send_stream(stream_events(payload, include_usage))
+                else:
+                    self._send(status, payload)
+            else:
+                self._send(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(fake, host="127.0.0.1", port=0):
+    """Start the stub in a daemon thread and return the running server (see server_address)."""
+    server = ThreadingHTTPServer((host, port), _handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.2, help="standard deviation, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with 429")
+    args = parser.parse_args()
+    server = serve(FakeOpenAI(args.latency, args.jitter, args.error_rate), port=args.port)
+    print(f"Fake OpenAI API listening on http://127.0.0.1:{server.server_address[1]}/v1")
+    threading.Event().wait()
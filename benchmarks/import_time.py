@@ -0,0 +1,83 @@
+"""
+Measure cold-start cost: how long importing each entry point takes in a fresh interpreter
+and which heavy dependencies it pulls in, plus the first-use cost of the lazy pieces.
+
+    python -m benchmarks.import_time --repeat 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+MODULES = ["main", "rule_extractor.app", "rule_extractor.main", "rule_extractor.extractor"]
+HEAVY = ["openai", "fitz", "tiktoken", "httpx", "fastapi"]
+
+# Runs in the child interpreter; prints a JSON line with the timing and loaded heavy modules
+IMPORT_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+FIRST_USE_PROBE = """
+import time, json
+from rule_extractor.chunk import get_tokenizer
+from rule_extractor.extractor import _get_client
+start = time.perf_counter()
+get_tokenizer()
+tokenizer = time.perf_counter() - start
+start = time.perf_counter()
+_get_client()
+client = time.perf_counter() - start
+print(json.dumps({"tokenizer": tokenizer, "client": client}))
+"""
+
+
+def _probe(code, env=None):
+    child = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    if child.returncode != 0:
+        return None, child.stderr.strip().splitlines()[-1]
+    return json.loads(child.stdout.strip().splitlines()[-1]), None
+
+
+def run(modules, repeat):
+    print(f"{'module':<28} {'median s':>9} {'max s':>8}  heavy modules loaded")
+    for module in modules:
+        timings, loaded, error = [], [], None
+        for _ in range(repeat):
+            result, error = _probe(IMPORT_PROBE.format(module=module, heavy=HEAVY))
+            if result is None:
+                break
+            timings.append(result["seconds"])
+            loaded = result["loaded"]
+        if error:
+            print(f"{module:<28} failed: {error}")
+            continue
+        print(
+            f"{module:<28} {statistics.median(timings):>9.3f} {max(timings):>8.3f}  "
+            f"{', '.join(loaded) or '-'}"
+        )
+
+    env = {"OPENAI_API_KEY": "benchmark", **os.environ}
+    result, error = _probe(FIRST_USE_PROBE, env)
+    if result is None:
+        print(f"First use failed: {error}")
+    else:
+        print(
+            f"First use: tokenizer {result['tokenizer']:.3f}s, OpenAI client {result['client']:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.modules, args.repeat)
@@ -0,0 +1,52 @@
+"""
+Compare serial and process-pool PDF text extraction to find the page count at which
+sharding starts to pay for the worker start-up cost (PDF_PARALLEL_MIN_PAGES).
+
+    python -m benchmarks.pdf_text --workers 4 --pages 10 25 50 100 200 400 800
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from rule_extractor.utils import iter_pdf_pages, _iter_pdf_pages_parallel
+from .synthetic import make_pdf
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(page_counts, workers, repeat):
+    print(f"{'pages':>6} {'serial s':>10} {'parallel s':>11} {'speedup':>8}")
+    crossover = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = make_pdf(os.path.join(tmp, f"bench_{pages}.pdf"), pages)
+            serial = _best_of(lambda: sum(1 for _ in iter_pdf_pages(path, workers=1)), repeat)
+            parallel = _best_of(
+                lambda: sum(1 for _ in _iter_pdf_pages_parallel(path, pages, workers)), repeat
+            )
+            print(f"{pages:>6} {serial:>10.3f} {parallel:>11.3f} {serial / parallel:>7.2f}x")
+            if crossover is None and parallel < serial:
+                crossover = pages
+    if crossover is None:
+        print("Parallel extraction never beat serial extraction in this range.")
+    else:
+        print(f"Crossover: parallel extraction wins from about {crossover} pages.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 25, 50, 100, 200, 400, 800])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.pages, args.workers, args.repeat)
@@ -0,0 +1,193 @@
+"""
+End-to-end benchmark of the extraction pipeline that runs without network access.
+
+Synthetic PDFs of several sizes and heading densities are generated, the OpenAI client is
+pointed at benchmarks.fake_openai, and pdf_to_text, chunk_text and main() are each timed in a
+fresh subprocess so peak RSS is measured per stage. The LLM cache and incremental extraction
+are switched off so every run does the full amount of work.
+
+    python -m benchmarks.pipeline --pages 10 50 200 --density 2 8 --repeat 5 --latency 0.5
+
+tiktoken's cl100k_base file is loaded once up front, from TIKTOKEN_CACHE_DIR or tiktoken's
+default cache, and the stages reuse it. Without network access it must already be cached
+there; the benchmark exits with a message saying so otherwise.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import contextlib
+import subprocess
+import urllib.request
+from .synthetic import make_pdf
+from .fake_openai import FakeOpenAI, serve
+
+STAGES = ("pdf_to_text", "chunk_text", "main")
+
+
+def _run_stage(stage, pdf_path):
+    """Child side: time one stage on one document and report it as a JSON line."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if stage == "pdf_to_text":
+            from rule_extractor.utils import pdf_to_text
+
+            start = time.perf_counter()
+            pdf_to_text(pdf_path)
+        elif stage == "chunk_text":
+            from rule_extractor.chunk import chunk_text
+
+            # Text is extracted by the parent so only chunking counts towards peak RSS
+            with open(pdf_path + ".txt") as f:
+                text = f.read()
+            start = time.perf_counter()
+            chunk_text(text, return_sections=True)
+        else:
+            from rule_extractor.main import main
+
+            start = time.perf_counter()
+            main(pdf_path)
+        seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": peak_rss_mb}))
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def _stub_request(base_url, path):
+    method = "POST" if path == "/reset" else "GET"
+    request = urllib.request.Request(
+        base_url + path, data=b"{}" if method == "POST" else None, method=method
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _check_tokenizer():
+    """Load the encoding in the parent, so the stages never have to download it."""
+    from rule_extractor.chunk import get_tokenizer
+
+    try:
+        get_tokenizer()
+    except Exception as e:
+        cache_dir = os.getenv("TIKTOKEN_CACHE_DIR") or os.path.join(
+            tempfile.gettempdir(), "data-gym-cache"
+        )
+        sys.exit(
+            f"tiktoken's cl100k_base encoding is not in {cache_dir} and could not be downloaded "
+            f"({type(e).__name__}: {e}). Run once with network access, or set TIKTOKEN_CACHE_DIR "
+            f"to a directory that already holds it."
+        )
+
+
+def run(page_counts, densities, repeat, stages, latency, jitter, error_rate, output=None):
+    _check_tokenizer()
+    fake = FakeOpenAI(latency, jitter, error_rate)
+    server = serve(fake)
+    stub_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY="benchmark",
+            OPENAI_BASE_URL=stub_url + "/v1",
+            LLM_CACHE_BYPASS="1",
+            INCREMENTAL_EXTRACTION="false",
+            RULE_EXTRACTOR_CACHE_DIR=os.path.join(tmp, "cache"),
+        )
+        from rule_extractor.utils import pdf_to_text
+
+        print(
+            f"{'document':<16} {'stage':<12} {'p50 s':>8} {'p95 s':>8} {'pages/s':>9} "
+            f"{'LLM calls':>10} {'peak MB':>8}"
+        )
+        for pages in page_counts:
+            for density in densities:
+                name = f"p{pages}_h{density}"
+                pdf_path = make_pdf(
+                    os.path.join(tmp, name + ".pdf"), pages, headings_per_page=density
+                )
+                with open(pdf_path + ".txt", "w") as f:
+                    f.write(pdf_to_text(pdf_path))
+                for stage in stages:
+                    timings, peaks, calls = [], [], []
+                    for _ in range(repeat):
+                        _stub_request(stub_url, "/reset")
+                        child = subprocess.run(
+                            [
+                                sys.executable,
+                                "-m",
+                                "benchmarks.pipeline",
+                                "--stage",
+                                stage,
+                                pdf_path,
+                            ],
+                            env=env,
+                            capture_output=True,
+                            text=True,
+                            check=True,
+                        )
+                        measured = json.loads(child.stdout.strip().splitlines()[-1])
+                        timings.append(measured["seconds"])
+                        peaks.append(measured["peak_rss_mb"])
+                        calls.append(sum(_stub_request(stub_url, "/stats")["calls"].values()))
+                    row = {
+                        "document": name,
+                        "pages": pages,
+                        "headings_per_page": density,
+                        "stage": stage,
+                        "p50_seconds": _percentile(timings, 50),
+                        "p95_seconds": _percentile(timings, 95),
+                        "pages_per_second": pages * len(timings) / sum(timings),
+                        "llm_calls_per_document": sum(calls) / len(calls),
+                        "peak_rss_mb": max(peaks),
+                    }
+                    results.append(row)
+                    print(
+                        f"{name:<16} {stage:<12} {row['p50_seconds']:>8.3f} {row['p95_seconds']:>8.3f} "
+                        f"{row['pages_per_second']:>9.1f} {row['llm_calls_per_document']:>10.1f} "
+                        f"{row['peak_rss_mb']:>8.1f}"
+                    )
+    server.shutdown()
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--density", type=int, nargs="+", default=[2, 8], help="headings per page")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--latency", type=float, default=0.5, help="mean stub latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("pdf", nargs="?", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.stage:
+        _run_stage(args.stage, args.pdf)
+    else:
+        run(
+            args.pages,
+            args.density,
+            args.repeat,
+            args.stages,
+            args.latency,
+            args.jitter,
+            args.error_rate,
+            args.output,
+        )
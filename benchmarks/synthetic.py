@@ -0,0 +1,35 @@
+"""Synthetic regulatory-style PDFs for benchmarks."""
+
+import random
+import fitz
+
+SENTENCES = [
+    "Marketers must not mislead consumers by omitting material information.",
+    "Operators shall ensure that gambling advertisements are socially responsible.",
+    "Promotions must state all significant conditions before purchase.",
+    "Advertisements should not be directed at people under 18 through the selection of media.",
+    "Claims must be supported by documentary evidence held at the time of publication.",
+    "Marketing communications may only refer to prices that are genuinely available.",
+    "The identity of the marketer should be clear unless obvious from the context.",
+    "Contracts must not contain terms that are unfair to the consumer.",
+]
+
+
+def make_pdf(path, pages, headings_per_page=4, sentences_per_section=3, seed=0):
+    """Write a PDF of numbered clauses ("1.1", "1.2", ...) and return its path."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    section, clause = 1, 0
+    for _ in range(pages):
+        lines = []
+        for _ in range(headings_per_page):
+            clause += 1
+            if clause > 9:
+                section, clause = section + 1, 1
+            body = " ".join(rng.choice(SENTENCES) for _ in range(sentences_per_section))
+            lines.append(f"{section}.{clause} {body}")
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(54, 54, 558, 788), "\n".join(lines), fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
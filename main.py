@@ -1,56 +1,50 @@
 import functions_framework
-import json
 import uuid
-import httpx
-import tempfile
 import os
 import asyncio
+import threading
 
-# Import our existing rule extraction logic
-from rule_extractor.main import main as extract_rules
+from rule_extractor.metrics import job_metrics, span
+# The extraction pipeline, httpx and the webhook dispatcher are imported on first use so a
+# cold instance can answer health checks without loading openai, fitz and tiktoken
+
+# The tiktoken encoding bundled with the function source (make tiktoken-cache) spares cold
+# instances the download; an explicit TIKTOKEN_CACHE_DIR still takes precedence
+BUNDLED_TIKTOKEN_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tiktoken_cache")
+if os.path.isdir(BUNDLED_TIKTOKEN_CACHE):
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", BUNDLED_TIKTOKEN_CACHE)
 
 # Configuration
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
+_webhook_dispatcher = None
+_webhook_dispatcher_lock = threading.Lock()
+
 async def download_and_validate_file(file_url: str) -> str:
-    """Download file from URL and return temporary file path"""
+    """Stream file from URL to a temporary file and return its path"""
+    import httpx
+    from rule_extractor.download import download_to_temp_file
     async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
-        response = await client.get(file_url)
-        response.raise_for_status()
-        
-        # Check file size
-        content_length = response.headers.get('content-length')
-        if content_length and int(content_length) > MAX_FILE_SIZE_BYTES:
-            raise Exception(f"File size exceeds the limit of {MAX_FILE_SIZE_MB}MB.")
-        
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        temp_file.write(response.content)
-        temp_file.close()
-        
-        return temp_file.name
+        downloaded = await download_to_temp_file(client, file_url, MAX_FILE_SIZE_BYTES)
+        return downloaded.path
 
-async def send_webhook(webhook_url: str, payload: dict, job_id: str, event_type: str):
-    """Send webhook notification"""
-    try:
-        headers = {
-            "Content-Type": "application/json", 
-            "X-Event": event_type,
-            "X-Job-Process-Id": job_id
-        }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                webhook_url, 
-                json=payload, 
-                headers=headers
-            )
-            print(f"Webhook sent: {event_type} -> {response.status_code}")
-            return response.status_code == 200
-    except Exception as e:
-        print(f"Webhook error: {e}")
-        return False
+def send_webhook(webhook_url: str, payload: dict, job_id: str, event_type: str):
+    """Queue webhook notification for background delivery with retries"""
+    from rule_extractor.webhooks import encode_payload
+    body, headers = encode_payload(payload)
+    headers["X-Event"] = event_type
+    headers["X-Job-Process-Id"] = job_id
+    return _get_webhook_dispatcher().submit(webhook_url, body, headers, job_id=job_id)
+
+def _get_webhook_dispatcher():
+    # One pooled dispatcher per instance, running on its own event loop thread
+    global _webhook_dispatcher
+    with _webhook_dispatcher_lock:
+        if _webhook_dispatcher is None:
+            from rule_extractor.webhooks import start_dispatcher_thread
+            _webhook_dispatcher = start_dispatcher_thread()
+    return _webhook_dispatcher
 
 @functions_framework.http
 def extract_rules_function(request):
@@ -90,57 +84,67 @@ def extract_rules_function(request):
             if not file_url or not webhook_url:
                 return {"error": "Missing file_url or webhook_url"}, 400
             
-            # Generate job ID
-            job_id = str(uuid.uuid4())
+            # Resubmitting a job_process_id resumes that job from its chunk checkpoints
+            job_id = request_json.get('job_process_id') or str(uuid.uuid4())
+            if not isinstance(job_id, str) or len(job_id) > 128:
+                return {"error": "Invalid job_process_id"}, 400
             print(f"Starting job {job_id}")
             
               # IMMEDIATE RESPONSE - Return job ID right away
-            import threading
-            
             def process_in_background():
                 """Background processing that runs after response is sent"""
                 async def process_with_webhooks():
+                    from rule_extractor.main import main as extract_rules
+                    
                     # 1. Send immediate webhook
                     immediate_payload = {
                         "job_process_id": job_id,
                         "status": "processing",
                         "message": "Job received and processing started"
                     }
-                    await send_webhook(webhook_url, immediate_payload, job_id, "rules.processing.v1")
+                    send_webhook(webhook_url, immediate_payload, job_id, "rules.processing.v1")
                     
                     # 2. Process the PDF
-                    temp_file_path = None
-                    try:
-                        # Download and process
-                        temp_file_path = await download_and_validate_file(file_url)
-                        print(f"Processing PDF: {temp_file_path}")
+                    with job_metrics() as job:
+                        temp_file_path = None
+                        try:
+                            # Download and process
+                            with span("download"):
+                                temp_file_path = await download_and_validate_file(file_url)
+                            print(f"Processing PDF: {temp_file_path}")
                         
-                        rules_json = extract_rules(temp_file_path)
-                        rules = json.loads(rules_json)
+                            rules = extract_rules(
+                                temp_file_path, incremental=False, job_id=job_id, save_output=False
+                            )
                         
-                        # 3. Send success webhook
-                        success_payload = {
-                            "job_process_id": job_id,
-                            "status": "success",
-                            "rules": rules
-                        }
-                        await send_webhook(webhook_url, success_payload, job_id, "rules.extracted.v1")
-                        print(f"Job {job_id} completed successfully")
+                            # 3. Send success webhook
+                            success_payload = {
+                                "job_process_id": job_id,
+                                "status": "success",
+                                "rules": rules,
+                                "metrics": job.as_dict()
+                            }
+                            delivery = send_webhook(webhook_url, success_payload, job_id, "rules.extracted.v1")
+                            print(f"Job {job_id} completed successfully")
                         
-                    except Exception as e:
-                        # 3. Send failure webhook
-                        failure_payload = {
-                            "job_process_id": job_id,
-                            "status": "failure",
-                            "error": str(e)
-                        }
-                        await send_webhook(webhook_url, failure_payload, job_id, "rules.extraction.failed.v1")
-                        print(f"Job {job_id} failed: {e}")
+                        except Exception as e:
+                            # 3. Send failure webhook
+                            failure_payload = {
+                                "job_process_id": job_id,
+                                "status": "failure",
+                                "error": str(e),
+                                "metrics": job.as_dict()
+                            }
+                            delivery = send_webhook(webhook_url, failure_payload, job_id, "rules.extraction.failed.v1")
+                            print(f"Job {job_id} failed: {e}")
                         
-                    finally:
-                        # Clean up
-                        if temp_file_path and os.path.exists(temp_file_path):
-                            os.unlink(temp_file_path)
+                        finally:
+                            # Clean up
+                            if temp_file_path and os.path.exists(temp_file_path):
+                                os.unlink(temp_file_path)
+                    
+                    # Stay alive until the final event is delivered (or dead-lettered)
+                    await asyncio.wrap_future(delivery)
                 
                 # Run the async processing
                 asyncio.run(process_with_webhooks())
@@ -1,138 +1,558 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, HttpUrl
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import os
-import json
+import copy
+import time
 import uuid
+import contextvars
 import httpx
-import tempfile
+import asyncio
+from . import metrics
+from .config import CACHE_DIR
+from .download import DownloadedFile, download_to_temp_file
+from .jobs import JobQueue, QueueFullError
+from .rule_index import rule_index
+from .checkpoints import chunk_checkpoints
+from .results import result_cache
+from .webhooks import WebhookDispatcher, encode_payload
+
+# Simple configuration
+MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
+MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+
+# Job queue: at most JOB_WORKERS extractions run at once and at most MAX_QUEUED_JOBS wait
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "100"))
+JOB_RETRY_AFTER_SECONDS = int(os.getenv("JOB_RETRY_AFTER_SECONDS", "30"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+# Jobs interrupted by this many restarts (a document that crashes the service) are failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Most files accepted by one /v1/extract/batch request
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+
+job_queue = JobQueue(JOB_DB_PATH, max_queued=MAX_QUEUED_JOBS, max_attempts=JOB_MAX_ATTEMPTS)
+# Blocking extraction work runs here rather than on the event loop's default threadpool
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_job_available = asyncio.Event()
+webhook_dispatcher = WebhookDispatcher()
+# Futures of the extractions currently running, by result cache key, for jobs to join
+_in_flight = {}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await webhook_dispatcher.start()
+    job_queue.prune(JOB_RETENTION_SECONDS)
+    chunk_checkpoints.prune(JOB_RETENTION_SECONDS)
+    requeued, abandoned = job_queue.requeue_interrupted()
+    if requeued:
+        print(f"Requeued {requeued} jobs interrupted by the last shutdown")
+    for job_id, payload, error in abandoned:
+        print(f"Job {job_id} failed: {error} by restarts")
+        if "documents" in payload:
+            status_payload = {"batch_id": job_id, "status": "failure", "error": error}
+            event_type = "rules.batch.failed.v1"
+        else:
+            status_payload = {"job_process_id": job_id, "status": "failure", "error": error}
+            event_type = "rules.extraction.failed.v1"
+        _post_webhook(payload["webhook_url"], status_payload, job_id, event_type)
+    workers = [asyncio.create_task(_job_worker()) for _ in range(JOB_WORKERS)]
+    yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    job_executor.shutdown(wait=False, cancel_futures=True)
+    await webhook_dispatcher.stop()
+
 
 app = FastAPI(
     title="Rule Extractor API",
     description="API for extracting rules from PDF documents.",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
-# Simple configuration
-MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
-MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
 class ExtractRequest(BaseModel):
     file_url: HttpUrl
     webhook_url: HttpUrl
+    # Send rules.partial.v1 webhooks per finished chunk instead of one rules.extracted.v1
+    stream: bool = False
+
+
+class BatchExtractRequest(BaseModel):
+    file_urls: List[HttpUrl] = Field(..., min_length=1, max_length=MAX_BATCH_FILES)
+    webhook_url: HttpUrl
+
 
 @app.get("/", response_class=JSONResponse)
 async def root():
     return {"message": "Welcome to the Rule Extractor API. Visit /v1/health or /v1/extract."}
 
+
 @app.get("/v1/health", response_class=JSONResponse)
 async def health_check():
     return {"status": "healthy"}
 
-async def _download_file_from_url(file_url: str) -> str:
-    """Download file from URL and return temporary file path"""
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _check_content_type(file_url: str, response):
+    # Check content type (be more flexible for Google Drive)
+    content_type = response.headers.get("content-type", "").lower()
+    print(f"Downloaded file content-type: {content_type}")
+
+    # Google Drive sometimes returns different content types, so let's be more flexible
+    if not any(
+        x in content_type for x in ["pdf", "application/octet-stream", "binary/octet-stream"]
+    ):
+        # Also check if the URL suggests it's a PDF
+        if not file_url.lower().endswith(".pdf") and "drive.google" not in file_url.lower():
+            raise HTTPException(
+                status_code=400, detail="Invalid file type. Only PDF files are allowed."
+            )
+
+
+async def _download_file_from_url(file_url: str) -> DownloadedFile:
+    """Stream file from URL to a temporary file, enforcing MAX_FILE_SIZE_BYTES"""
     async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        response = await client.get(file_url)
-        response.raise_for_status()
-        
-        # Check file size
-        content_length = response.headers.get('content-length')
-        if content_length and int(content_length) > MAX_FILE_SIZE_BYTES:
-            raise HTTPException(status_code=413, detail=f"File size exceeds the limit of {MAX_FILE_SIZE_MB}MB.")
-        
-        # Check content type (be more flexible for Google Drive)
-        content_type = response.headers.get('content-type', '').lower()
-        print(f"Downloaded file content-type: {content_type}")
-        
-        # Google Drive sometimes returns different content types, so let's be more flexible
-        if not any(x in content_type for x in ['pdf', 'application/octet-stream', 'binary/octet-stream']):
-            # Also check if the URL suggests it's a PDF
-            if not file_url.lower().endswith('.pdf') and 'drive.google' not in file_url.lower():
-                raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are allowed.")
-        
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        temp_file.write(response.content)
-        temp_file.close()
-        
-        return temp_file.name
-
-async def _post_webhook(webhook_url: str, body: str, job_id: str = None, event_type: str = "rules.extracted.v1"):
+        return await download_to_temp_file(
+            client,
+            file_url,
+            MAX_FILE_SIZE_BYTES,
+            check_response=partial(_check_content_type, file_url),
+        )
+
+
+def _post_webhook(
+    webhook_url: str, payload: dict, job_id: str = None, event_type: str = "rules.extracted.v1"
+):
+    """Queue a webhook for background delivery; returns without waiting for the receiver"""
+    # The payload, Rule objects included, is serialised here and nowhere else
+    body, headers = encode_payload(payload)
+    headers["X-Event"] = event_type
+    if job_id:
+        headers["X-Job-Process-Id"] = job_id
+    print(f"Queueing webhook to {webhook_url} with event {event_type} and job {job_id}")
+    return webhook_dispatcher.submit(webhook_url, body, headers, job_id=job_id)
+
+
+async def _job_worker():
+    while True:
+        job = job_queue.claim()
+        if job is None:
+            # Woken up by new submissions; the timeout also picks up requeued jobs
+            try:
+                await asyncio.wait_for(_job_available.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                pass
+            _job_available.clear()
+            continue
+        job_id, payload = job
+        try:
+            if "documents" in payload:
+                await _process_batch_and_notify(
+                    job_id, payload["documents"], payload["webhook_url"]
+                )
+            else:
+                await _process_and_notify(
+                    job_id,
+                    payload["file_url"],
+                    payload["webhook_url"],
+                    payload.get("stream", False),
+                )
+        except Exception as e:
+            print(f"Unexpected error in job worker for job {job_id}: {e}")
+            job_queue.finish(job_id, "failure", error=str(e))
+
+
+def _post_partial_webhook(
+    webhook_url: str, job_id: str, sequence: int, chunk_index: int, rules: list
+):
+    # Streamed rules become searchable as soon as their chunk is done
+    rule_index.add(rules, job_id=job_id)
+    partial_payload = {
+        "job_process_id": job_id,
+        "status": "partial",
+        "sequence": sequence,
+        "chunk_index": chunk_index,
+        "rules": rules,
+    }
+    _post_webhook(webhook_url, partial_payload, job_id, "rules.partial.v1")
+
+
+async def _extract_file(job_id: str, temp_file_path: str, webhook_url: str, stream: bool):
+    """Run the pipeline on a downloaded file; returns (rules, partial_count, complete)."""
+    from .main import main, stream_rules
+
+    print(f"Starting rule extraction for {temp_file_path}")
+    # Uploads are stored under random temporary names, so there is no earlier
+    # revision to diff against. Chunks are checkpointed under the job id instead, so a
+    # job requeued after a restart resumes where it stopped.
+    loop = asyncio.get_running_loop()
+    # The extraction thread runs in a copy of this context so its metrics count towards the job
+    run_in_job_context = contextvars.copy_context().run
+    failed_chunks = []
+    if stream:
+        streamed = []
+
+        def on_chunk(sequence, chunk_index, rules):
+            streamed.extend(rules)
+            _post_partial_webhook(webhook_url, job_id, sequence, chunk_index, rules)
+
+        # Partial webhooks go out from the extraction thread as each chunk finishes
+        summary = await loop.run_in_executor(
+            job_executor,
+            run_in_job_context,
+            partial(
+                stream_rules,
+                temp_file_path,
+                on_chunk=on_chunk,
+                incremental=False,
+                job_id=job_id,
+                failed_chunks=failed_chunks,
+            ),
+        )
+        return streamed, summary["chunk_count"], not failed_chunks
+    rules = await loop.run_in_executor(
+        job_executor,
+        run_in_job_context,
+        partial(
+            main,
+            temp_file_path,
+            incremental=False,
+            job_id=job_id,
+            failed_chunks=failed_chunks,
+            save_output=False,
+        ),
+    )
+    await loop.run_in_executor(job_executor, partial(rule_index.add, rules, job_id=job_id))
+    return rules, None, not failed_chunks
+
+
+def _own_copy(rules):
+    """A copy of rules shared with another job, with fresh rule_ids so each job indexes its own."""
+    rules = copy.deepcopy(rules)
+    for rule in rules:
+        rule.rule_id = str(uuid.uuid4())
+    return rules
+
+
+async def _run_job(job_id: str, file_url: str, webhook_url: str, stream: bool) -> dict:
+    """Download and extract one document; returns the completion payload."""
+    status_payload = {"job_process_id": job_id, "status": "failure", "error": "unknown"}
+    temp_file_path = None
+
+    try:
+        print(f"Starting background processing for job {job_id}")
+
+        # Download file from URL
+        with metrics.span("download"):
+            downloaded = await _download_file_from_url(file_url)
+        temp_file_path = downloaded.path
+        print(f"File downloaded successfully: {temp_file_path} ({downloaded.size} bytes)")
+
+        # Identical files share one result: from the cache, or by joining a job that is
+        # already extracting the same bytes
+        key = result_cache.key(downloaded.sha256)
+        rules = result_cache.get(key)
+        if rules is not None:
+            print(f"Using cached rules for file {downloaded.sha256[:12]}")
+        elif key in _in_flight:
+            print(f"Job {job_id} joins the running extraction of file {downloaded.sha256[:12]}")
+            rules, error = await asyncio.shield(_in_flight[key])
+            if error is not None:
+                raise error
+        if rules is not None:
+            rules = _own_copy(rules)
+            # Streaming jobs get the whole document as a single partial event
+            index_and_notify = (
+                partial(_post_partial_webhook, webhook_url, job_id, 1, 0, rules)
+                if stream
+                else partial(rule_index.add, rules, job_id=job_id)
+            )
+            await asyncio.get_running_loop().run_in_executor(job_executor, index_and_notify)
+            partial_count = 1
+        else:
+            _in_flight[key] = asyncio.get_running_loop().create_future()
+            try:
+                rules, partial_count, complete = await _extract_file(
+                    job_id, temp_file_path, webhook_url, stream
+                )
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    e = RuntimeError("the extraction of this file was cancelled")
+                _in_flight.pop(key).set_result((None, e))
+                raise
+            _in_flight.pop(key).set_result((rules, None))
+            # Results with failed chunks are not cached so a resubmission retries them
+            if complete:
+                result_cache.set(key, rules)
+        if stream:
+            status_payload = {
+                "job_process_id": job_id,
+                "status": "success",
+                "rule_count": len(rules),
+                "partial_count": partial_count,
+            }
+        else:
+            status_payload = {"job_process_id": job_id, "status": "success", "rules": rules}
+        print(f"Rule extraction completed successfully for job {job_id}")
+
+    except Exception as e:
+        print(f"Error in background processing for job {job_id}: {e}")
+        status_payload = {"job_process_id": job_id, "status": "failure", "error": str(e)}
+
+    finally:
+        # Clean up temporary file and the streamed rules file written next to it
+        if temp_file_path:
+            base_path = temp_file_path.rsplit(".", 1)[0]
+            for path in (temp_file_path, base_path + "_rules.ndjson"):
+                if os.path.exists(path):
+                    os.unlink(path)
+            print(f"Cleaned up temporary file: {temp_file_path}")
+
+    return status_payload
+
+
+async def _process_and_notify(job_id: str, file_url: str, webhook_url: str, stream: bool = False):
+    started = time.perf_counter()
+    with metrics.job_metrics() as job:
+        status_payload = await _run_job(job_id, file_url, webhook_url, stream)
+    status_payload["metrics"] = job.as_dict()
+    metrics.record_job(status_payload["status"], time.perf_counter() - started)
+    job_queue.finish(
+        job_id,
+        status_payload["status"],
+        error=status_payload.get("error"),
+        rule_count=status_payload.get("rule_count", len(status_payload.get("rules", []))),
+        metrics=status_payload["metrics"],
+    )
+
+    # Post completion webhook; streamed jobs end with a small completion event
+    if status_payload["status"] != "success":
+        event_type = "rules.extraction.failed.v1"
+    elif stream:
+        event_type = "rules.completed.v1"
+    else:
+        event_type = "rules.extracted.v1"
+    print(f"Queueing completion webhook for job {job_id} with status {status_payload['status']}")
+    _post_webhook(webhook_url, status_payload, job_id, event_type)
+
+
+async def _run_batch(batch_id: str, documents: list) -> dict:
+    """Download and extract the documents of a batch together; returns the completion payload."""
+    downloads = await asyncio.gather(
+        *(_download_file_from_url(document["file_url"]) for document in documents),
+        return_exceptions=True,
+    )
+    results = []
+    paths = {}
+    for document, downloaded in zip(documents, downloads):
+        result = {"job_process_id": document["job_process_id"], "file_url": document["file_url"]}
+        if isinstance(downloaded, BaseException):
+            print(f"Download failed for {document['file_url']} in batch {batch_id}: {downloaded}")
+            result.update(
+                status="failure", error=getattr(downloaded, "detail", None) or str(downloaded)
+            )
+        else:
+            paths[downloaded.path] = result
+        results.append(result)
+
     try:
-        headers = {"Content-Type": "application/json", "X-Event": event_type}
-        if job_id:
-            headers["X-Job-Process-Id"] = job_id
-        print(f"Sending webhook to {webhook_url} with event {event_type} and job {job_id}")
-        
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(webhook_url, data=body.encode("utf-8"), headers=headers)
-            print(f"Webhook response: {response.status_code}")
+        if paths:
+            from .main import extract_batch
+
+            loop = asyncio.get_running_loop()
+            extracted = await loop.run_in_executor(
+                job_executor, contextvars.copy_context().run, partial(extract_batch, list(paths))
+            )
+            for path, result in paths.items():
+                outcome = extracted[path]
+                if "error" in outcome:
+                    result.update(status="failure", error=outcome["error"])
+                else:
+                    await loop.run_in_executor(
+                        job_executor,
+                        partial(rule_index.add, outcome["rules"], job_id=result["job_process_id"]),
+                    )
+                    result.update(status="success", rules=outcome["rules"])
     except Exception as e:
-        print(f"Webhook error: {e}")
+        print(f"Error in batch processing for batch {batch_id}: {e}")
+        for result in paths.values():
+            result.update(status="failure", error=str(e))
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    failed = sum(1 for result in results if result["status"] == "failure")
+    status_payload = {
+        "batch_id": batch_id,
+        "status": "success" if failed < len(results) else "failure",
+        "documents": results,
+    }
+    if failed:
+        status_payload["error"] = f"{failed} of {len(results)} documents failed"
+    return status_payload
+
+
+async def _process_batch_and_notify(batch_id: str, documents: list, webhook_url: str):
+    started = time.perf_counter()
+    with metrics.job_metrics() as job:
+        status_payload = await _run_batch(batch_id, documents)
+    status_payload["metrics"] = job.as_dict()
+    metrics.record_job(status_payload["status"], time.perf_counter() - started)
+    job_queue.finish(
+        batch_id,
+        status_payload["status"],
+        error=status_payload.get("error"),
+        rule_count=sum(len(result.get("rules", [])) for result in status_payload["documents"]),
+        metrics=status_payload["metrics"],
+    )
+    event_type = (
+        "rules.batch.extracted.v1"
+        if status_payload["status"] == "success"
+        else "rules.batch.failed.v1"
+    )
+    print(
+        f"Queueing completion webhook for batch {batch_id} with status {status_payload['status']}"
+    )
+    _post_webhook(webhook_url, status_payload, batch_id, event_type)
 
 
 @app.post("/v1/extract", response_class=JSONResponse)
-async def extract_rules_endpoint(
-    extract_request: ExtractRequest,
-    background_tasks: BackgroundTasks
-):
+async def extract_rules_endpoint(extract_request: ExtractRequest):
     # Generate job ID immediately
     job_id = str(uuid.uuid4())
-    
+
+    # Queue the job; when the queue is full the client should retry later
+    try:
+        job_queue.enqueue(
+            job_id,
+            {
+                "file_url": str(extract_request.file_url),
+                "webhook_url": str(extract_request.webhook_url),
+                "stream": extract_request.stream,
+            },
+        )
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": str(e)},
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)},
+        )
+    _job_available.set()
+
     # Send immediate webhook notification (job received)
     immediate_payload = {
         "job_process_id": job_id,
         "status": "processing",
-        "message": "Job received and processing started"
+        "message": "Job received and processing started",
     }
-    
-    # Send immediate webhook synchronously
-    await _post_webhook(
-        str(extract_request.webhook_url), 
-        json.dumps(immediate_payload, ensure_ascii=False), 
+
+    # Delivered in the background so a slow receiver does not delay the response
+    _post_webhook(
+        str(extract_request.webhook_url),
+        immediate_payload,
         job_id,
-        event_type="rules.processing.v1"
+        event_type="rules.processing.v1",
     )
-    
-    async def _process_and_notify():
-        status_payload = {"job_process_id": job_id, "status": "failure", "error": "unknown"}
-        temp_file_path = None
-        
-        try:
-            print(f"Starting background processing for job {job_id}")
-            
-            # Download file from URL
-            temp_file_path = await _download_file_from_url(str(extract_request.file_url))
-            print(f"File downloaded successfully: {temp_file_path}")
-            
-            # Process the file
-            from .main import main
-            print(f"Starting rule extraction for {temp_file_path}")
-            rules_json = main(temp_file_path)
-            rules = json.loads(rules_json)
-            status_payload = {"job_process_id": job_id, "status": "success", "rules": rules}
-            print(f"Rule extraction completed successfully for job {job_id}")
-            
-        except Exception as e:
-            print(f"Error in background processing for job {job_id}: {e}")
-            status_payload = {"job_process_id": job_id, "status": "failure", "error": str(e)}
-        
-        finally:
-            # Clean up temporary file
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-                print(f"Cleaned up temporary file: {temp_file_path}")
-        
-        # Post completion webhook
-        event_type = "rules.extracted.v1" if status_payload["status"] == "success" else "rules.extraction.failed.v1"
-        print(f"Sending completion webhook for job {job_id} with status {status_payload['status']}")
-        await _post_webhook(str(extract_request.webhook_url), json.dumps(status_payload, ensure_ascii=False), job_id, event_type)
-        print(f"Completion webhook sent for job {job_id}")
-
-    # Start background processing
-    background_tasks.add_task(_process_and_notify)
 
     # Return immediately with job ID
-    return JSONResponse(status_code=202, content={"job_process_id": job_id}, headers={"X-Job-Process-Id": job_id})
\ No newline at end of file
+    return JSONResponse(
+        status_code=202, content={"job_process_id": job_id}, headers={"X-Job-Process-Id": job_id}
+    )
+
+
+@app.post("/v1/extract/batch", response_class=JSONResponse)
+async def extract_batch_endpoint(batch_request: BatchExtractRequest):
+    """
+    Queue several documents as one job. Their chunks share one worker pool and chunks that
+    appear in more than one document are extracted once. Results for every document arrive
+    in a single rules.batch.extracted.v1 webhook under the batch id.
+    """
+    batch_id = str(uuid.uuid4())
+    documents = [
+        {"job_process_id": str(uuid.uuid4()), "file_url": str(file_url)}
+        for file_url in batch_request.file_urls
+    ]
+    try:
+        job_queue.enqueue(
+            batch_id, {"documents": documents, "webhook_url": str(batch_request.webhook_url)}
+        )
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": str(e)},
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)},
+        )
+    _job_available.set()
+
+    immediate_payload = {
+        "batch_id": batch_id,
+        "status": "processing",
+        "documents": documents,
+        "message": "Batch received and processing started",
+    }
+    _post_webhook(
+        str(batch_request.webhook_url),
+        immediate_payload,
+        batch_id,
+        event_type="rules.batch.processing.v1",
+    )
+    return JSONResponse(
+        status_code=202,
+        content={"batch_id": batch_id, "documents": documents},
+        headers={"X-Job-Process-Id": batch_id},
+    )
+
+
+@app.get("/v1/jobs/{job_id}", response_class=JSONResponse)
+async def get_job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {
+        "job_process_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "rule_count": job["rule_count"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "metrics": job["metrics"],
+    }
+
+
+@app.get("/v1/rules/search", response_class=JSONResponse)
+async def search_rules(
+    q: str = Query(..., min_length=1),
+    category: str = None,
+    source_document: str = None,
+    job_process_id: str = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Full-text search over the rules of finished jobs, best bm25 matches first."""
+    results = rule_index.search(
+        q,
+        category=category,
+        source_document=source_document,
+        job_id=job_process_id,
+        limit=limit,
+        offset=offset,
+    )
+    return {"query": q, "results": [{"score": score, "rule": rule} for score, rule in results]}
@@ -0,0 +1,185 @@
+"""
+Batch extraction for backfills: runs main() over many PDFs in a pool of worker processes and
+writes one JSON line per document.
+
+    python -m rule_extractor.batch archive/ "scans/**/*.pdf" manifest.txt --output rules.jsonl
+
+Sources may be directories (searched recursively for PDFs), glob patterns or manifest files
+listing one PDF path per line. Documents whose _rules.json is newer than the PDF are not
+extracted again; their stored rules are written to the output as they are.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .config import MAX_CONCURRENT_CHUNKS, OPENAI_RATE_LIMITS
+from .models import to_json
+
+_max_concurrency = None
+
+
+def collect_pdfs(sources):
+    """Expand directories, globs and manifests into a sorted list of unique PDF paths."""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(glob.glob(os.path.join(source, "**", "*.pdf"), recursive=True))
+        elif os.path.isfile(source) and not source.lower().endswith(".pdf"):
+            base_dir = os.path.dirname(source)
+            with open(source) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        paths.append(os.path.join(base_dir, line))
+        else:
+            paths.extend(glob.glob(source, recursive=True))
+    return sorted({os.path.abspath(path) for path in paths})
+
+
+def rules_path(pdf_path):
+    return pdf_path.rsplit(".", 1)[0] + "_rules.json"
+
+
+def is_up_to_date(pdf_path):
+    """True when the document's _rules.json was written after the PDF last changed."""
+    out_file = rules_path(pdf_path)
+    return os.path.exists(out_file) and os.path.getmtime(out_file) >= os.path.getmtime(pdf_path)
+
+
+def _init_worker(max_concurrency, quota_share, quiet):
+    global _max_concurrency
+    _max_concurrency = max_concurrency
+    # Each process has its own rate limiter, so each gets its share of the quota
+    from . import extractor
+    from .ratelimit import RateLimiter, parse_rate_limits
+
+    extractor.rate_limiter = RateLimiter(parse_rate_limits(OPENAI_RATE_LIMITS, quota_share))
+    if quiet:
+        # The pipeline's per-chunk logging would drown the progress lines
+        sys.stdout = open(os.devnull, "w")
+    # Paid once per worker rather than once per document
+    from .chunk import get_tokenizer
+
+    get_tokenizer()
+
+
+def _extract(pdf_path):
+    """Worker side: extract one document and return its output record."""
+    from . import metrics
+    from .main import main
+
+    start = time.perf_counter()
+    try:
+        with metrics.job_metrics() as job:
+            rules = main(pdf_path, max_concurrency=_max_concurrency)
+    except Exception as e:
+        return {"path": pdf_path, "status": "failure", "error": str(e)}
+    return {
+        "path": pdf_path,
+        "status": "success",
+        "seconds": round(time.perf_counter() - start, 3),
+        "rules": rules,
+        "metrics": job.as_dict(),
+    }
+
+
+def run_batch(pdf_paths, output, workers=None, llm_concurrency=None, force=False, quiet=True):
+    """
+    Extract every document in pdf_paths across workers processes, writing one JSON line
+    per document to the output file object as documents finish. llm_concurrency caps the
+    LLM requests in flight across all workers (and so the number of workers); each worker gets
+    an equal share of it and of the OPENAI_RATE_LIMITS quota, which its document's chunk and
+    refinement requests draw from. Returns a count per status.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    if llm_concurrency:
+        workers = min(workers, max(1, llm_concurrency))
+    else:
+        llm_concurrency = workers * MAX_CONCURRENT_CHUNKS
+    counts = {"success": 0, "failure": 0, "up_to_date": 0}
+    pending = []
+    for pdf_path in pdf_paths:
+        if not force and is_up_to_date(pdf_path):
+            with open(rules_path(pdf_path)) as f:
+                rules = json.load(f)
+            record = {"path": pdf_path, "status": "up_to_date", "rules": rules}
+            output.write(to_json(record) + "\n")
+            counts["up_to_date"] += 1
+        else:
+            pending.append(pdf_path)
+    workers = max(1, min(workers, len(pending)))
+    per_worker = max(1, llm_concurrency // workers)
+    print(
+        f"{len(pdf_paths)} documents: {counts['up_to_date']} up to date, {len(pending)} to extract "
+        f"with {workers} workers and {per_worker} LLM requests per worker"
+    )
+    if not pending:
+        return counts
+
+    start = time.perf_counter()
+    rule_count = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(per_worker, 1 / workers, quiet),
+    ) as executor:
+        futures = [executor.submit(_extract, pdf_path) for pdf_path in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            output.write(to_json(record) + "\n")
+            output.flush()
+            counts[record["status"]] += 1
+            rule_count += len(record.get("rules", []))
+            elapsed = time.perf_counter() - start
+            detail = f"{len(record['rules'])} rules" if "rules" in record else record["error"]
+            print(
+                f"[{done}/{len(pending)}] {record['status']}: {record['path']} ({detail}) - "
+                f"{done / elapsed * 60:.1f} docs/min, {rule_count / elapsed:.1f} rules/s"
+            )
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract rules from many PDFs in parallel.")
+    parser.add_argument("sources", nargs="+", help="directories, glob patterns or manifest files")
+    parser.add_argument(
+        "--output", default="rules.jsonl", help="JSONL file to write, '-' for stdout"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=None,
+        help=f"LLM requests in flight across all workers (default: {MAX_CONCURRENT_CHUNKS} per worker)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="re-extract documents that are up to date"
+    )
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's own logging")
+    args = parser.parse_args()
+
+    pdf_paths = collect_pdfs(args.sources)
+    with contextlib.ExitStack() as stack:
+        if args.output == "-":
+            output = sys.stdout
+            # Progress goes to stderr so stdout stays valid JSONL
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        else:
+            output = stack.enter_context(open(args.output, "w"))
+        counts = run_batch(
+            pdf_paths,
+            output,
+            args.workers,
+            args.llm_concurrency,
+            args.force,
+            quiet=not args.verbose,
+        )
+    print(", ".join(f"{count} {status}" for status, count in counts.items()), file=sys.stderr)
+    sys.exit(1 if counts["failure"] else 0)
@@ -0,0 +1,74 @@
+import os
+import time
+import sqlite3
+import threading
+from .config import CACHE_DIR
+from .models import to_json
+
+
+class ChunkCheckpoints:
+    """
+    SQLite store of each finished chunk's rules, keyed by job id and chunk index, so a job
+    that is restarted or resubmitted under the same id only extracts the chunks it is
+    missing. The chunk's fingerprint is stored with its rules and must match on resume, so a
+    checkpoint is never applied to a different document.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "job_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, fingerprint TEXT NOT NULL, "
+                "rules TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (job_id, chunk_index))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def load(self, job_id):
+        """Return {chunk_index: (fingerprint, rules JSON string)} for a job."""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT chunk_index, fingerprint, rules FROM checkpoints WHERE job_id = ?",
+                    (job_id,),
+                )
+                .fetchall()
+            )
+        return {chunk_index: (fingerprint, rules) for chunk_index, fingerprint, rules in rows}
+
+    def save(self, job_id, chunk_index, fingerprint, rules):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(job_id, chunk_index, fingerprint, rules, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, chunk_index, fingerprint, to_json(rules, compact=True), time.time()),
+            )
+            conn.commit()
+
+    def clear(self, job_id):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+            conn.commit()
+
+    def prune(self, older_than_seconds):
+        """Delete checkpoints of jobs abandoned more than older_than_seconds ago."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "DELETE FROM checkpoints WHERE created_at < ?", (time.time() - older_than_seconds,)
+            )
+            conn.commit()
+
+
+chunk_checkpoints = ChunkCheckpoints(os.path.join(CACHE_DIR, "checkpoints.sqlite3"))
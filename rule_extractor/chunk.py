@@ -1,63 +1,205 @@
 import re
-from .config import MAX_TOKENS_PER_CHUNK, OVERLAP_TOKENS
-import tiktoken
+import hashlib
+import threading
+from typing import NamedTuple
+from .config import MAX_TOKENS_PER_CHUNK, OVERLAP_TOKENS, PACK_TOKENS_PER_CHUNK
 
-tokenizer = tiktoken.get_encoding("cl100k_base")
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
 
-def chunk_text(text, return_sections=False):
+
+def get_tokenizer():
+    """
+    The cl100k_base encoding, loaded on first use so importing this module stays cheap.
+    Loading reads the BPE file from TIKTOKEN_CACHE_DIR, downloading it if it is missing.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                import tiktoken
+
+                _tokenizer = tiktoken.get_encoding("cl100k_base")
+    return _tokenizer
+
+
+HEADING_PATTERN = re.compile(r"(^|\n)(\d+(\.\d+)*[a-z]?)\s+", re.MULTILINE)
+
+# Separator placed between sections packed into the same chunk
+PACK_SEPARATOR = "\n\n"
+
+
+class Chunk(NamedTuple):
+    text: str
+    heading: str
+    # Headings of every section in this chunk (more than one once sections are packed)
+    headings: list
+    token_count: int
+    # False for pieces of a section that had to be split by token count
+    packable: bool = True
+
+
+def chunk_text(text, return_sections=False, pack=False):
     """
     Split text into chunks based on numbered rules or headings.
     If no numbered rules found, fallback to fixed token chunking.
     If return_sections is True, also return a list of section headings (one per chunk).
+    If pack is True, adjacent short sections are merged (see pack_chunks).
     """
-    pattern = re.compile(r"(^|\n)(\d+(\.\d+)*[a-z]?)\s+", re.MULTILINE)
-    splits = list(pattern.finditer(text))
-    
     chunks = []
     sections = []
-    if len(splits) < 2:
-        # fallback fixed size chunking
-        tokens = tokenizer.encode(text)
-        start = 0
-        while start < len(tokens):
-            end = min(start + MAX_TOKENS_PER_CHUNK, len(tokens))
-            chunk_tokens = tokens[start:end]
-            chunk_text_str = tokenizer.decode(chunk_tokens)
-            chunks.append(chunk_text_str)
-            sections.append("General")
-            start = end - OVERLAP_TOKENS
-    else:
-        # chunk by rule headings
-        for i in range(len(splits)):
-            start_pos = splits[i].start()
-            end_pos = splits[i + 1].start() if i + 1 < len(splits) else len(text)
-            chunk_text_str = text[start_pos:end_pos].strip()
-            # Optionally check token length and merge if too small
-            chunk_tokens = tokenizer.encode(chunk_text_str)
-            if len(chunk_tokens) > MAX_TOKENS_PER_CHUNK:
-                # fallback to fixed chunking inside this chunk if needed
-                sub_chunks = chunk_text_fixed(chunk_text_str)
-                chunks.extend(sub_chunks)
-                # Use the heading for all subchunks
-                heading = chunk_text_str.split('\n', 1)[0].strip()
-                sections.extend([heading] * len(sub_chunks))
-            else:
-                chunks.append(chunk_text_str)
-                heading = chunk_text_str.split('\n', 1)[0].strip()
-                sections.append(heading)
+    produced = iter_chunks([text])
+    if pack:
+        produced = pack_chunks(produced)
+    for chunk in produced:
+        chunks.append(chunk.text)
+        sections.append(chunk.heading)
     if return_sections:
         return chunks, sections
     else:
         return chunks
 
-def chunk_text_fixed(text):
-    tokens = tokenizer.encode(text)
-    chunks = []
+
+def iter_chunks(pages):
+    """
+    Lazily chunk an iterable of page texts, yielding Chunk tuples.
+    A numbered section is yielded as soon as the next heading is seen, so callers can start
+    working on the first sections while later pages are still being read. Produces the same
+    chunks as chunk_text on the pages joined with newlines.
+    """
+    buffer = ""
+    has_text = False
+    started = False
+    # Text before the first heading; dropped once a second heading shows the document
+    # is numbered, otherwise it is needed for the fixed-size fallback
+    preamble = None
+    for page in pages:
+        # A new heading can only start on the last (incomplete) line of what we already have
+        scan_from = max(buffer.rfind("\n"), 0)
+        buffer = buffer + "\n" + page if has_text else page
+        has_text = True
+        if not started:
+            first = HEADING_PATTERN.search(buffer, scan_from)
+            if first is None:
+                continue
+            preamble, buffer = buffer[: first.start()], buffer[first.start() :]
+            started = True
+            scan_from = 0
+        # buffer always starts at the heading of the section still being collected
+        while True:
+            current = HEADING_PATTERN.match(buffer)
+            following = HEADING_PATTERN.search(buffer, max(scan_from, current.end()))
+            if following is None:
+                break
+            preamble = None
+            yield from _section_chunks(buffer[: following.start()].strip())
+            buffer = buffer[following.start() :]
+            scan_from = 0
+
+    if not started or preamble is not None:
+        # fallback fixed size chunking
+        text = preamble + buffer if started else buffer
+        tokenizer = get_tokenizer()
+        for chunk_tokens in _fixed_windows(tokenizer.encode(text)):
+            yield Chunk(
+                tokenizer.decode(chunk_tokens), "General", ["General"], len(chunk_tokens), False
+            )
+    else:
+        yield from _section_chunks(buffer.strip())
+
+
+def _section_chunks(section_text):
+    """Yield Chunks for one numbered section, splitting it if it is too long."""
+    heading = section_text.split("\n", 1)[0].strip()
+    tokenizer = get_tokenizer()
+    tokens = tokenizer.encode(section_text)
+    if len(tokens) > MAX_TOKENS_PER_CHUNK:
+        # fallback to fixed chunking inside this chunk, using the heading for all subchunks;
+        # the tokens are reused rather than encoding the section a second time
+        for chunk_tokens in _fixed_windows(tokens):
+            yield Chunk(
+                tokenizer.decode(chunk_tokens), heading, [heading], len(chunk_tokens), False
+            )
+    else:
+        yield Chunk(section_text, heading, [heading], len(tokens))
+
+
+def pack_chunks(chunks, max_tokens=PACK_TOKENS_PER_CHUNK):
+    """
+    Greedily merge runs of adjacent short sections into chunks of at most max_tokens tokens.
+    The merged chunk keeps the first section's heading and lists every section heading in
+    Chunk.headings. Pieces of split sections and fixed-size chunks are passed through as is.
+    Works lazily, so it can sit directly behind iter_chunks.
+
+    Besides the budget, a chunk is also closed after "anchor" sections picked from a hash of
+    their text (on average every half budget). Boundaries therefore depend only on nearby
+    content: editing one section of a revised document changes the chunks around it but
+    leaves the rest identical, which keeps incremental re-extraction effective.
+    """
+    pending = []
+    pending_tokens = 0
+    for chunk in chunks:
+        if pending and (not chunk.packable or pending_tokens + chunk.token_count > max_tokens):
+            yield _merge_chunks(pending)
+            pending, pending_tokens = [], 0
+        if not chunk.packable:
+            yield chunk
+            continue
+        pending.append(chunk)
+        # Token counts of adjacent sections add up to within a token or two per separator
+        pending_tokens += chunk.token_count + 1
+        if _is_anchor(chunk, max_tokens):
+            yield _merge_chunks(pending)
+            pending, pending_tokens = [], 0
+    if pending:
+        yield _merge_chunks(pending)
+
+
+def _is_anchor(chunk, max_tokens):
+    digest = hashlib.blake2b(chunk.text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64 < 2 * chunk.token_count / max_tokens
+
+
+def _merge_chunks(chunks):
+    if len(chunks) == 1:
+        return chunks[0]
+    return Chunk(
+        PACK_SEPARATOR.join(chunk.text for chunk in chunks),
+        chunks[0].heading,
+        [heading for chunk in chunks for heading in chunk.headings],
+        sum(chunk.token_count for chunk in chunks) + len(chunks) - 1,
+    )
+
+
+def split_text(text, min_length=200):
+    """Split text in two at the section, line or word break nearest its middle."""
+    if len(text) < min_length:
+        return None
+    middle = len(text) // 2
+    for separator in (PACK_SEPARATOR, "\n", " "):
+        cuts = [
+            i for i in (text.rfind(separator, 0, middle), text.find(separator, middle)) if i > 0
+        ]
+        if cuts:
+            cut = min(cuts, key=lambda i: abs(i - middle))
+            halves = [text[:cut].strip(), text[cut:].strip()]
+            if all(halves):
+                return halves
+    return None
+
+
+def _fixed_windows(tokens):
+    """Split a token list into MAX_TOKENS_PER_CHUNK windows overlapping by OVERLAP_TOKENS."""
     start = 0
     while start < len(tokens):
         end = min(start + MAX_TOKENS_PER_CHUNK, len(tokens))
-        chunk_tokens = tokens[start:end]
-        chunk_text_str = tokenizer.decode(chunk_tokens)
-        chunks.append(chunk_text_str)
+        yield tokens[start:end]
+        if end == len(tokens):
+            break
         start = end - OVERLAP_TOKENS
-    return chunks
\ No newline at end of file
+
+
+def chunk_text_fixed(text):
+    tokenizer = get_tokenizer()
+    tokens = tokenizer.encode(text)
+    return [tokenizer.decode(chunk_tokens) for chunk_tokens in _fixed_windows(tokens)]
@@ -1,2 +1,84 @@
+import os
+
 MAX_TOKENS_PER_CHUNK = 8000
 OVERLAP_TOKENS = 200
+# Completion budget of a first-pass extraction request; output cut off at this length is
+# kept and the rest of the chunk re-requested in smaller pieces
+EXTRACTION_COMPLETION_TOKENS = int(os.getenv("EXTRACTION_COMPLETION_TOKENS", "4000"))
+
+# Models for first-pass extraction, category classification and complex-rule refinement
+EXTRACTION_MODEL = "gpt-5-mini"
+CLASSIFICATION_MODEL = "gpt-5-mini"
+REFINEMENT_MODEL = "gpt-5"
+
+# Maximum number of chunks sent to the LLM at the same time
+MAX_CONCURRENT_CHUNKS = int(os.getenv("MAX_CONCURRENT_CHUNKS", "8"))
+
+# Local on-disk state (LLM response cache and friends)
+CACHE_DIR = os.getenv(
+    "RULE_EXTRACTOR_CACHE_DIR", os.path.join(os.getcwd(), ".rule_extractor_cache")
+)
+
+# LLM response cache: entries older than the TTL or beyond the size cap are evicted
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+# PDF text extraction: documents with at least PDF_PARALLEL_MIN_PAGES pages are split into
+# page ranges of PDF_SHARD_PAGES and extracted across PDF_WORKERS processes
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "150"))
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "25"))
+
+# Section packing: adjacent short numbered sections are merged into one chunk of at most
+# PACK_TOKENS_PER_CHUNK tokens so each LLM request carries a useful amount of text
+PACK_SECTIONS = os.getenv("PACK_SECTIONS", "true").lower() in ("1", "true", "yes")
+PACK_TOKENS_PER_CHUNK = int(os.getenv("PACK_TOKENS_PER_CHUNK", "2000"))
+
+# Incremental re-extraction: rules are stored per chunk fingerprint for each source document
+# so a new revision only sends added or changed chunks to the LLM
+INCREMENTAL_EXTRACTION = os.getenv("INCREMENTAL_EXTRACTION", "true").lower() in ("1", "true", "yes")
+
+# Webhook delivery: failed deliveries are retried with exponential backoff and written to the
+# dead-letter file once WEBHOOK_MAX_ATTEMPTS attempts have failed
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "6"))
+WEBHOOK_PER_HOST_CONCURRENCY = int(os.getenv("WEBHOOK_PER_HOST_CONCURRENCY", "4"))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "15"))
+WEBHOOK_DEAD_LETTER_PATH = os.getenv(
+    "WEBHOOK_DEAD_LETTER_PATH", os.path.join(CACHE_DIR, "webhook_dead_letters.jsonl")
+)
+# Webhook bodies: JSON without whitespace between tokens, and gzip with Content-Encoding: gzip
+WEBHOOK_COMPACT_JSON = os.getenv("WEBHOOK_COMPACT_JSON", "false").lower() in ("1", "true", "yes")
+WEBHOOK_GZIP = os.getenv("WEBHOOK_GZIP", "false").lower() in ("1", "true", "yes")
+
+# Second pass: complex rules from the whole document are re-extracted with gpt-5 in requests
+# of up to REFINE_BATCH_SIZE rules, MAX_CONCURRENT_REFINEMENTS requests at a time
+REFINE_BATCH_SIZE = int(os.getenv("REFINE_BATCH_SIZE", "8"))
+MAX_CONCURRENT_REFINEMENTS = int(os.getenv("MAX_CONCURRENT_REFINEMENTS", "4"))
+
+# OpenAI quotas per model as "model=requests_per_minute/tokens_per_minute", comma separated;
+# models not listed are not throttled locally
+OPENAI_RATE_LIMITS = os.getenv("OPENAI_RATE_LIMITS", "gpt-5-mini=5000/2000000,gpt-5=5000/450000")
+# Attempts per LLM request on rate limits and transient API errors
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))
+
+# Duplicate rules (same normalised text, or word-shingle Jaccard similarity of at least
+# DEDUP_SIMILARITY) from overlapping or repeated sections are merged into the first one
+DEDUP_RULES = os.getenv("DEDUP_RULES", "true").lower() in ("1", "true", "yes")
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.8"))
+
+# Searchable store of the rules produced by API jobs (SQLite FTS5)
+RULE_INDEX_PATH = os.getenv("RULE_INDEX_PATH", os.path.join(CACHE_DIR, "rules.sqlite3"))
+
+# A chunk whose extraction fails is retried up to CHUNK_MAX_ATTEMPTS times, then split in two
+# and its halves extracted separately, at most CHUNK_MAX_SPLIT_DEPTH levels deep
+CHUNK_MAX_ATTEMPTS = int(os.getenv("CHUNK_MAX_ATTEMPTS", "2"))
+CHUNK_MAX_SPLIT_DEPTH = int(os.getenv("CHUNK_MAX_SPLIT_DEPTH", "2"))
+
+# Whole-document results are cached by file hash and pipeline version for this long (0 disables)
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Chunks whose normative-language score (see prefilter.score_chunk; roughly the number of
+# must/shall/may only style markers) is below PREFILTER_THRESHOLD are not sent to the LLM
+# (0 sends every chunk)
+PREFILTER_THRESHOLD = float(os.getenv("PREFILTER_THRESHOLD", "1"))
@@ -0,0 +1,131 @@
+import re
+import struct
+import hashlib
+from .config import DEDUP_SIMILARITY
+
+# MinHash signature length and its split into LSH bands (BANDS * ROWS == NUM_PERM). With 8
+# bands of 4 rows, pairs at Jaccard 0.8 become candidates ~98% of the time and pairs at 0.3
+# under 7% of the time; candidates are then checked against the exact Jaccard similarity.
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+
+# Words that change what a rule requires. Near-duplicate candidates whose wording differs in
+# any of them, or in a number, are kept apart however similar the rest of the text is.
+MEANING_WORDS = frozenset(
+    """
+    not no never nor neither none without cannot t unless except only
+    must shall should may might can could will would need needs required mandatory optional
+    prohibited forbidden permitted allowed
+    before after prior following until since during within earlier later
+    more less fewer greater least most minimum maximum above below over under exceed exceeds
+    one two three four five six seven eight nine ten twelve first second third
+    """.split()
+)
+
+# One 64-byte blake2b digest per shingle supplies all 32 hash functions as 16-bit values
+_DIGEST_VALUES = struct.Struct(f"<{NUM_PERM}H")
+
+
+def normalise(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+def shingles(normalised_text):
+    words = normalised_text.split()
+    if len(words) <= SHINGLE_WORDS:
+        return {normalised_text}
+    return {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def changes_meaning(words, other_words):
+    """True when the words only one of two rules uses include a MEANING_WORDS word or a number."""
+    return any(
+        word in MEANING_WORDS or any(char.isdigit() for char in word)
+        for word in words ^ other_words
+    )
+
+
+def minhash(shingle_set):
+    rows = [
+        _DIGEST_VALUES.unpack(hashlib.blake2b(s.encode("utf-8"), digest_size=64).digest())
+        for s in shingle_set
+    ]
+    return list(map(min, zip(*rows)))
+
+
+class RuleDeduplicator:
+    """
+    Online duplicate filter for extracted rules. A rule whose normalised rule_text matches a
+    kept rule exactly, or whose word shingles have a Jaccard similarity of at least threshold
+    with one (found through MinHash LSH, so each rule is only compared with a few
+    candidates), is a duplicate. Similar rules that differ in a negation, modal verb, number or
+    before/after-type term (see changes_meaning) are not. Unless merge is False, duplicates are folded into the kept
+    rule: tags are merged and the duplicate's rule_id is added to metadata["merged_rule_ids"].
+    """
+
+    def __init__(self, threshold=None, merge=True):
+        self.threshold = DEDUP_SIMILARITY if threshold is None else threshold
+        self.merge = merge
+        self.duplicates = 0
+        self._exact = {}
+        self._buckets = {}
+        self._kept = []
+
+    def add(self, rule):
+        """Return the kept rule that rule duplicates, or None if rule is new (and now kept)."""
+        text = normalise(rule.rule_text)
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        kept = self._exact.get(digest)
+        if kept is None:
+            shingle_set = shingles(text)
+            signature = minhash(shingle_set)
+            bands = [
+                (band, tuple(signature[band * ROWS : (band + 1) * ROWS])) for band in range(BANDS)
+            ]
+            words = set(text.split())
+            kept = self._near_duplicate(shingle_set, words, bands)
+            if kept is None:
+                self._exact[digest] = rule
+                self._kept.append((rule, shingle_set, words))
+                position = len(self._kept) - 1
+                for key in bands:
+                    self._buckets.setdefault(key, []).append(position)
+                return None
+        self.duplicates += 1
+        if self.merge:
+            _merge_into(kept, rule)
+        return kept
+
+    def _near_duplicate(self, shingle_set, words, bands):
+        seen = set()
+        for key in bands:
+            for position in self._buckets.get(key, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                kept, kept_shingles, kept_words = self._kept[position]
+                union = len(shingle_set | kept_shingles)
+                if (
+                    union
+                    and len(shingle_set & kept_shingles) / union >= self.threshold
+                    and not changes_meaning(words, kept_words)
+                ):
+                    return kept
+        return None
+
+
+def _merge_into(kept, duplicate):
+    kept.tags = sorted(set(kept.tags) | set(duplicate.tags))
+    merged = kept.metadata.setdefault("merged_rule_ids", [])
+    if duplicate.rule_id:
+        merged.append(duplicate.rule_id)
+    merged.extend(duplicate.metadata.get("merged_rule_ids", []))
+
+
+def deduplicate_rules(rules, threshold=None):
+    """Return rules without duplicates, keeping the first occurrence of each (see RuleDeduplicator)."""
+    deduplicator = RuleDeduplicator(threshold)
+    return [rule for rule in rules if deduplicator.add(rule) is None]
@@ -0,0 +1,50 @@
+import os
+import hashlib
+import tempfile
+from typing import NamedTuple
+
+# Size of the blocks the response body is streamed to disk in
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Raised when a download is larger than the allowed size."""
+
+
+class DownloadedFile(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+
+async def download_to_temp_file(client, url, max_bytes, suffix=".pdf", check_response=None):
+    """
+    Stream url into a temporary file in DOWNLOAD_BLOCK_SIZE blocks, hashing it on the way.
+    The download is aborted as soon as more than max_bytes arrive, whether or not the server
+    sent a Content-Length, so memory use stays flat regardless of the file size.
+    check_response, if given, is called with the response before the body is read.
+    """
+    too_large = f"File size exceeds the limit of {max_bytes // (1024 * 1024)}MB."
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        content_length = response.headers.get("content-length")
+        if content_length and int(content_length) > max_bytes:
+            raise FileTooLargeError(too_large)
+        if check_response:
+            check_response(response)
+
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with temp_file:
+                async for block in response.aiter_bytes(DOWNLOAD_BLOCK_SIZE):
+                    size += len(block)
+                    if size > max_bytes:
+                        raise FileTooLargeError(too_large)
+                    digest.update(block)
+                    temp_file.write(block)
+        except BaseException:
+            os.unlink(temp_file.name)
+            raise
+    return DownloadedFile(temp_file.name, digest.hexdigest(), size)
@@ -1,145 +1,607 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
- 
+
+import re
 import json
+import time
+import threading
+import contextvars
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from . import metrics
+from .cache import llm_cache
+from .chunk import get_tokenizer, split_text
+from .models import Rule, to_json
+from .jsonstream import JsonArrayParser
+from .ratelimit import RateLimiter, parse_rate_limits
+from .config import (
+    EXTRACTION_MODEL,
+    EXTRACTION_COMPLETION_TOKENS,
+    CHUNK_MAX_SPLIT_DEPTH,
+    CLASSIFICATION_MODEL,
+    REFINEMENT_MODEL,
+    REFINE_BATCH_SIZE,
+    MAX_CONCURRENT_REFINEMENTS,
+    OPENAI_RATE_LIMITS,
+    LLM_MAX_ATTEMPTS,
+)
+
+load_dotenv()
+
+# The openai package is slow to import, so it and the clients are loaded on first use
+_client = None
+_client_lock = threading.Lock()
+rate_limiter = RateLimiter(parse_rate_limits(OPENAI_RATE_LIMITS))
+
+
+def _get_client():
+    """The shared OpenAI client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import openai
 
-load_dotenv() 
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise ValueError("OPENAI_API_KEY environment variable not set")
+                # Retries are handled here, in step with the shared rate limiter, rather than by the client
+                _client = openai.OpenAI(api_key=api_key, max_retries=0)
+    return _client
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
 
-client = OpenAI(api_key=api_key)
+def _retryable_errors():
+    import openai
+
+    return (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class TruncatedOutputError(ValueError):
+    """
+    Raised when a chunk's rules still do not fit in the completion budget after splitting.
+    rules holds what was extracted before the output was cut off, so the chunk can be kept
+    as incomplete rather than dropped.
+    """
+
+    def __init__(self, message, rules=()):
+        super().__init__(message)
+        self.rules = list(rules)
+
 
 ALLOWED_CATEGORIES = ["Marketing", "Gambling", "Legal", "Compliance"]
 
+
 def load_prompt(path):
     base_dir = os.path.dirname(__file__)
     absolute_path = os.path.join(base_dir, path)
-    with open(absolute_path, 'r') as f:
+    with open(absolute_path, "r") as f:
         return f.read()
 
+
+def _estimate_tokens(messages, max_completion_tokens):
+    # The completion budget counts against the quota up front, as in OpenAI's own limiter
+    tokenizer = get_tokenizer()
+    prompt_tokens = sum(len(tokenizer.encode(m["content"])) + 4 for m in messages)
+    return prompt_tokens + max_completion_tokens
+
+
+def _retry_delay(error, attempt):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[header]) * scale
+        except (KeyError, TypeError, ValueError):
+            pass
+    return min(30.0, 2.0**attempt)
+
+
+def _handle_retryable(model, estimate, error, attempt):
+    """Refund a failed request's reservation and return how long to back off before retrying."""
+    import openai
+
+    rate_limiter.refund(model, estimate)
+    metrics.record_llm_error(model, error)
+    if attempt == LLM_MAX_ATTEMPTS:
+        raise error
+    delay = _retry_delay(error, attempt)
+    if isinstance(error, openai.RateLimitError):
+        # Every caller of this model waits, not only the one that was throttled
+        rate_limiter.pause(model, delay)
+        delay = 0.0
+    print(f"{model} request failed ({type(error).__name__}), retrying (attempt {attempt + 1})...")
+    return delay
+
+
+def _settle_usage(model, estimate, usage):
+    metrics.record_llm_call(model, usage)
+    if usage is not None and usage.total_tokens is not None:
+        rate_limiter.refund(model, estimate - usage.total_tokens)
+
+
+def _chat_completion(model, messages, max_completion_tokens):
+    """Send one chat completion through the shared rate limiter and return its content."""
+    estimate = _estimate_tokens(messages, max_completion_tokens)
+    for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+        rate_limiter.acquire(model, estimate)
+        try:
+            response = _get_client().chat.completions.create(
+                model=model, messages=messages, max_completion_tokens=max_completion_tokens, n=1
+            )
+        except _retryable_errors() as e:
+            time.sleep(_handle_retryable(model, estimate, e, attempt))
+            continue
+        _settle_usage(model, estimate, getattr(response, "usage", None))
+        return response.choices[0].message.content
+
+
+def _stream_request(model, messages, max_completion_tokens):
+    return dict(
+        model=model,
+        messages=messages,
+        max_completion_tokens=max_completion_tokens,
+        n=1,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+
+def _read_stream_event(event, parser):
+    """Apply one streamed event; returns its (usage, finish_reason), either may be None."""
+    choice = event.choices[0] if event.choices else None
+    content = choice.delta.content if choice is not None and choice.delta is not None else None
+    if content:
+        parser.feed(content)
+    return getattr(event, "usage", None), choice.finish_reason if choice is not None else None
+
+
+def _stream_json_array(model, messages, max_completion_tokens):
+    """
+    Streamed _chat_completion for answers that are a JSON array of objects. Objects are
+    parsed as soon as they close, so what arrived before a cut-off is kept. Returns
+    (parser, finish_reason). An attempt that fails mid-stream is discarded and retried.
+    """
+    estimate = _estimate_tokens(messages, max_completion_tokens)
+    for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+        rate_limiter.acquire(model, estimate)
+        parser = JsonArrayParser()
+        usage = finish_reason = None
+        try:
+            stream = _get_client().chat.completions.create(
+                **_stream_request(model, messages, max_completion_tokens)
+            )
+            for event in stream:
+                event_usage, event_finish = _read_stream_event(event, parser)
+                usage = event_usage or usage
+                finish_reason = event_finish or finish_reason
+        except _retryable_errors() as e:
+            time.sleep(_handle_retryable(model, estimate, e, attempt))
+            continue
+        _settle_usage(model, estimate, usage)
+        return parser, finish_reason
+
+
+def _cached_json_completion(model, template, text, messages, max_completion_tokens):
+    cache_key = llm_cache.key(model, template, text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        metrics.record_cache_hit(model)
+        return json.loads(cached)
+    llm_output = _chat_completion(model, messages, max_completion_tokens)
+    result = json.loads(llm_output)
+    # Only well-formed output is worth replaying
+    llm_cache.set(cache_key, llm_output)
+    return result
+
+
 def postprocess_rules(rules, section_heading=None, source_document=None):
     extraction_time = datetime.now().isoformat()
     enriched = []
     for rule in rules:
-        enriched_rule = {
-            "rule_text": rule.get("rule_text", ""),
-            "context": rule.get("context", ""),
-            "tags": sorted(set(tag.lower() for tag in rule.get("tags", []))),
-            "category": rule.get("category", ""),
-            "metadata": {
+        enriched_rule = Rule(
+            rule_text=rule.get("rule_text", ""),
+            context=rule.get("context", ""),
+            tags=sorted(set(tag.lower() for tag in rule.get("tags", []))),
+            category=rule.get("category", ""),
+            metadata={
                 "extraction_timestamp": extraction_time,
-                "source_document": os.path.splitext(os.path.basename(source_document or ""))[0]
-            }
-        }
+                "source_document": os.path.splitext(os.path.basename(source_document or ""))[0],
+            },
+        )
         enriched.append(enriched_rule)
     return enriched
 
+
+CLASSIFY_INSTRUCTION = (
+    "Classify the following rule into exactly one category from this set: "
+    + ", ".join(ALLOWED_CATEGORIES)
+    + ". Respond with only the single category word, nothing else.\n\nRule:\n"
+)
+
+BATCH_CLASSIFY_INSTRUCTION = (
+    "Classify each of the following numbered rules into exactly one category from this set: "
+    + ", ".join(ALLOWED_CATEGORIES)
+    + ". Respond with only a JSON object mapping each rule number to its category word, "
+    + 'for example {"1": "Legal", "2": "Marketing"}, nothing else.\n\nRules:\n'
+)
+
+# Rules per batched classification request
+CLASSIFY_BATCH_SIZE = 50
+
+# Keyword patterns; a rule matching exactly one of them is classified locally
+CATEGORY_PATTERNS = {
+    "Marketing": re.compile(r"\b(advert\w*|marketing|promotion\w*|brand\w*)\b", re.IGNORECASE),
+    "Gambling": re.compile(r"\b(gambl\w*|bet|bets|betting|wager\w*|lotter\w*)\b", re.IGNORECASE),
+    "Legal": re.compile(r"\b(laws?|legal\w*|contract\w*|statut\w*)\b", re.IGNORECASE),
+}
+
+
+def keyword_category(rule_text):
+    """Return a category when the keyword fast path is confident, otherwise None."""
+    matches = [
+        category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(rule_text)
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def fallback_category(rule_text):
+    """Best-effort keyword guess used when the LLM gives no usable label."""
+    text = rule_text.lower()
+    if any(k in text for k in ["advert", "marketing", "promotion", "brand"]):
+        return "Marketing"
+    if any(k in text for k in ["gambl", "bet", "wager", "lottery"]):
+        return "Gambling"
+    if any(k in text for k in ["law", "legal", "contract", "clause", "statute"]):
+        return "Legal"
+    return "Compliance"
+
+
+def _normalise_category(label):
+    label = (label or "").strip().strip(".\"'").lower()
+    for allowed in ALLOWED_CATEGORIES:
+        if label == allowed.lower():
+            return allowed
+    return None
+
+
 def classify_category(rule_text: str) -> str:
     """Use the LLM to strictly classify rule_text into one of ALLOWED_CATEGORIES."""
-    instruction = (
-        "Classify the following rule into exactly one category from this set: "
-        + ", ".join(ALLOWED_CATEGORIES)
-        + ". Respond with only the single category word, nothing else.\n\nRule:\n"
-        + rule_text
-    )
+    return classify_categories([rule_text])[0]
+
+
+def _local_categories(rule_texts):
+    """Label what can be labelled without the LLM; return (labels, batches of pending indexes)."""
+    labels = [None] * len(rule_texts)
+    pending = []
+    for idx, rule_text in enumerate(rule_texts):
+        labels[idx] = keyword_category(rule_text)
+        if labels[idx] is None:
+            labels[idx] = llm_cache.get(
+                llm_cache.key(CLASSIFICATION_MODEL, CLASSIFY_INSTRUCTION, rule_text)
+            )
+        if labels[idx] is None:
+            pending.append(idx)
+    batches = [
+        pending[i : i + CLASSIFY_BATCH_SIZE] for i in range(0, len(pending), CLASSIFY_BATCH_SIZE)
+    ]
+    return labels, batches
+
+
+def _classification_messages(rule_texts, batch):
+    numbered = "\n".join(f"{n}. {rule_texts[idx]}" for n, idx in enumerate(batch, start=1))
+    return [
+        {"role": "system", "content": "You are a precise classifier."},
+        {"role": "user", "content": BATCH_CLASSIFY_INSTRUCTION + numbered},
+    ]
+
+
+def _apply_categories(rule_texts, labels, batch, llm_output):
     try:
-        response = client.chat.completions.create(
-            model="gpt-5-mini",
-            messages=[
-                {"role": "system", "content": "You are a precise classifier."},
-                {"role": "user", "content": instruction},
-            ],
-            max_completion_tokens=10,
-            n=1,
-        )
-        label = (response.choices[0].message.content or "").strip()
-        for allowed in ALLOWED_CATEGORIES:
-            if label.lower() == allowed.lower():
-                return allowed
-        text = rule_text.lower()
-        if any(k in text for k in ["advert", "marketing", "promotion", "brand"]):
-            return "Marketing"
-        if any(k in text for k in ["gambl", "bet", "wager", "lottery"]):
-            return "Gambling"
-        if any(k in text for k in ["law", "legal", "contract", "clause", "statute"]):
-            return "Legal"
-        return "Compliance"
-    except Exception:
-        text = rule_text.lower()
-        if any(k in text for k in ["advert", "marketing", "promotion", "brand"]):
-            return "Marketing"
-        if any(k in text for k in ["gambl", "bet", "wager", "lottery"]):
-            return "Gambling"
-        if any(k in text for k in ["law", "legal", "contract", "clause", "statute"]):
-            return "Legal"
-        return "Compliance"
+        answer = json.loads(llm_output or "{}")
+    except ValueError:
+        answer = {}
+    if not isinstance(answer, dict):
+        answer = {}
+    for n, idx in enumerate(batch, start=1):
+        label = _normalise_category(str(answer.get(str(n), "")))
+        if label:
+            llm_cache.set(
+                llm_cache.key(CLASSIFICATION_MODEL, CLASSIFY_INSTRUCTION, rule_texts[idx]), label
+            )
+        labels[idx] = label or fallback_category(rule_texts[idx])
+
+
+def classify_categories(rule_texts):
+    """
+    Classify a list of rule texts into ALLOWED_CATEGORIES, returning labels in input order.
+    Confident keyword matches and cached labels skip the LLM; the remaining rules are
+    labelled with one request per CLASSIFY_BATCH_SIZE rules and mapped back by number.
+    """
+    labels, batches = _local_categories(rule_texts)
+    for batch in batches:
+        try:
+            llm_output = _chat_completion(
+                CLASSIFICATION_MODEL,
+                _classification_messages(rule_texts, batch),
+                100 + 20 * len(batch),
+            )
+        except Exception as e:
+            print(f"Batch classification failed, using keyword fallback: {e}")
+            llm_output = None
+        _apply_categories(rule_texts, labels, batch, llm_output)
+    return labels
+
+
+def _uncategorised(rules):
+    return [r for r in rules if not r.get("category")]
+
+
+def _classify_missing(rules):
+    uncategorised = _uncategorised(rules)
+    if uncategorised:
+        with metrics.span("classification"):
+            labels = classify_categories([r.get("rule_text", "") for r in uncategorised])
+        for r, label in zip(uncategorised, labels):
+            r["category"] = label
+
 
 def is_complex_rule(rule):
     # Example: mark as complex if rule_text is very long or has many conjunctions
-    rule_text = rule.get("rule_text", "")
+    rule_text = rule.rule_text
     if len(rule_text.split()) > 60:
         return True
     if rule_text.count(" and ") + rule_text.count(" or ") > 3:
         return True
     return False
 
-def extract_rules_with_model(chunk_text, section_heading, source_document, model):
-    base_prompt = load_prompt("prompts/base_prompt.txt")
+
+# A cut-off chunk resumes after the sentence where the last extracted rule's first
+# REMAINDER_ANCHOR_WORDS words are found
+REMAINDER_ANCHOR_WORDS = 8
+SENTENCE_END = re.compile(r"[.;!?](?=\s|$)")
+
+
+def _extraction_messages(base_prompt, chunk_text):
     prompt = f"{base_prompt}\n\nText:\n{chunk_text}\n\nOutput:"
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You are a helpful rule extraction assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_completion_tokens=4000,
-        n=1
+    return [
+        {"role": "system", "content": "You are a helpful rule extraction assistant."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _extraction_result(model, base_prompt, chunk_text, parser, finish_reason):
+    """The rules of a streamed extraction answer and whether it was cut off. Complete answers are cached."""
+    if finish_reason == "length":
+        metrics.record_truncation(model)
+        return parser.objects, True
+    if not parser.done:
+        raise ValueError("Model output is not a complete JSON array")
+    # Stored as plain JSON, without any code fence the model wrapped the array in
+    llm_cache.set(llm_cache.key(model, base_prompt, chunk_text), json.dumps(parser.objects))
+    return parser.objects, False
+
+
+def _unprocessed_remainder(chunk_text, rules):
+    """
+    The text after the last passage of chunk_text that one of rules was taken from. Rules are
+    located by their first words; if none can be found the whole chunk is returned, and the
+    rules extracted twice are merged by deduplication.
+    """
+    end = 0
+    for rule in rules:
+        words = re.findall(r"\w+", rule.get("rule_text", ""))[:REMAINDER_ANCHOR_WORDS]
+        if len(words) < 3:
+            continue
+        match = re.search(r"\W+".join(map(re.escape, words)), chunk_text, re.IGNORECASE)
+        if match:
+            sentence_end = SENTENCE_END.search(chunk_text, match.end())
+            end = max(end, sentence_end.end() if sentence_end else len(chunk_text))
+    return chunk_text[end:].strip()
+
+
+def _remaining_pieces(chunk_text, rules, depth):
+    """Pieces of a cut-off chunk that still have to be extracted."""
+    remainder = _unprocessed_remainder(chunk_text, rules)
+    if not remainder:
+        return []
+    if depth >= CHUNK_MAX_SPLIT_DEPTH:
+        # Failing the chunk keeps the partial result out of the result cache and checkpoints
+        raise TruncatedOutputError(
+            f"Extraction output cut off again after {len(rules)} rules with "
+            f"{len(remainder)} characters of the chunk left",
+            rules,
+        )
+    pieces = split_text(remainder) or [remainder]
+    print(
+        f"Extraction output cut off after {len(rules)} rules; re-extracting the remaining "
+        f"{len(remainder)} characters in {len(pieces)} piece{'s' if len(pieces) > 1 else ''}."
     )
-    llm_output = response.choices[0].message.content
-    rules = json.loads(llm_output)
-    for r in rules:
-        if not r.get("category"):
-            r["category"] = classify_category(r.get("rule_text", ""))
+    return pieces
+
+
+def _extract_raw_rules(model, base_prompt, chunk_text, depth=0):
+    """
+    First-pass rules for chunk_text as the model returns them. The answer is streamed and
+    parsed as it arrives; when it is cut off at EXTRACTION_COMPLETION_TOKENS the rules that
+    did arrive are kept and only the rest of the chunk is re-requested, in halves, up to
+    CHUNK_MAX_SPLIT_DEPTH times; after that TruncatedOutputError is raised, carrying every
+    rule extracted from the chunk and its pieces.
+    """
+    cached = llm_cache.get(llm_cache.key(model, base_prompt, chunk_text))
+    if cached is not None:
+        metrics.record_cache_hit(model)
+        return json.loads(cached)
+    messages = _extraction_messages(base_prompt, chunk_text)
+    with metrics.span("extraction"):
+        answer = _stream_json_array(model, messages, EXTRACTION_COMPLETION_TOKENS)
+    rules, truncated = _extraction_result(model, base_prompt, chunk_text, *answer)
+    if truncated:
+        error = None
+        for piece in _remaining_pieces(chunk_text, rules, depth):
+            try:
+                rules.extend(_extract_raw_rules(model, base_prompt, piece, depth + 1))
+            except TruncatedOutputError as e:
+                # The other pieces are still extracted, so only the cut-off part is missing
+                rules.extend(e.rules)
+                error = error or e
+        if error:
+            raise TruncatedOutputError(str(error), rules)
+    return rules
+
+
+def extract_rules_with_model(chunk_text, section_heading, source_document, model):
+    base_prompt = load_prompt("prompts/base_prompt.txt")
+    try:
+        rules = _extract_raw_rules(model, base_prompt, chunk_text)
+    except TruncatedOutputError as e:
+        _classify_missing(e.rules)
+        e.rules = postprocess_rules(
+            e.rules, section_heading=section_heading, source_document=source_document
+        )
+        raise
+    _classify_missing(rules)
     return postprocess_rules(
-        rules,
-        section_heading=section_heading,
-        source_document=source_document
+        rules, section_heading=section_heading, source_document=source_document
     )
 
-def generate_rule_json(chunk_text, pdf_sections=None, source_document=None):
+
+def _refinement_request(batch):
+    refine_prompt = load_prompt("prompts/refine_prompt.txt")
+    numbered = "\n\n".join(f"{n}. {rule.rule_text}" for n, rule in enumerate(batch, start=1))
+    prompt = f"{refine_prompt}\n\nStatements:\n{numbered}\n\nOutput:"
+    messages = [
+        {"role": "system", "content": "You are a helpful rule extraction assistant."},
+        {"role": "user", "content": prompt},
+    ]
+    return refine_prompt, numbered, messages
+
+
+def _group_by_source(refined):
+    by_source = {}
+    for rule in refined:
+        try:
+            by_source.setdefault(int(rule.get("source")), []).append(rule)
+        except (TypeError, ValueError):
+            continue
+    return by_source
+
+
+def _replacements(batch, by_source, source_document):
+    """For each input rule, the refined rules that replace it (or the rule itself)."""
+    replacements = []
+    for n, original in enumerate(batch, start=1):
+        if n in by_source:
+            replacements.append(postprocess_rules(by_source[n], source_document=source_document))
+        else:
+            replacements.append([original])
+    return replacements
+
+
+def _refine_batch(batch, source_document, model):
+    """
+    Re-extract a batch of complex rules in one request. Returns a list with, for each input
+    rule, the rules that replace it (the original rule if the model returned nothing for it).
+    """
+    refine_prompt, numbered, messages = _refinement_request(batch)
+    with metrics.span("refinement"):
+        by_source = _group_by_source(
+            _cached_json_completion(model, refine_prompt, numbered, messages, 8000)
+        )
+    _classify_missing([rule for rules in by_source.values() for rule in rules])
+    return _replacements(batch, by_source, source_document)
+
+
+def _complex_rule_batches(rule_lists):
+    positions = [
+        (list_idx, rule_idx)
+        for list_idx, rules in enumerate(rule_lists)
+        for rule_idx, rule in enumerate(rules)
+        if is_complex_rule(rule)
+    ]
+    batches = [
+        positions[i : i + REFINE_BATCH_SIZE] for i in range(0, len(positions), REFINE_BATCH_SIZE)
+    ]
+    return positions, batches
+
+
+def _splice(rule_lists, replacements):
+    refined_lists = []
+    for list_idx, rules in enumerate(rule_lists):
+        refined = []
+        for rule_idx, rule in enumerate(rules):
+            refined.extend(replacements.get((list_idx, rule_idx), [rule]))
+        refined_lists.append(refined)
+    return refined_lists
+
+
+def refine_complex_rules(
+    rule_lists, source_document=None, model=REFINEMENT_MODEL, max_concurrency=None
+):
+    """
+    Second pass over a whole document: every rule flagged by is_complex_rule, across all of
+    rule_lists (one list per chunk), is re-extracted with the larger model. Complex rules are
+    packed REFINE_BATCH_SIZE to a request and the requests run concurrently. Refined rules are
+    spliced in place of the rule they came from; a batch that fails keeps its originals.
+    Returns new lists in the same shape as rule_lists.
+    """
+    positions, batches = _complex_rule_batches(rule_lists)
+    if not positions:
+        return [list(rules) for rules in rule_lists]
+
+    print(
+        f"Re-extracting {len(positions)} complex rules with {model} in {len(batches)} requests..."
+    )
+    replacements = {}
+    max_concurrency = max(1, max_concurrency or MAX_CONCURRENT_REFINEMENTS)
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+        # Each batch runs in a copy of the caller's context so it is counted against its job
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run,
+                _refine_batch,
+                [rule_lists[list_idx][rule_idx] for list_idx, rule_idx in batch],
+                source_document,
+                model,
+            ): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                replacements.update(zip(batch, future.result()))
+            except Exception as e:
+                print(f"Error refining complex rules, keeping first-pass rules: {e}")
+    return _splice(rule_lists, replacements)
+
+
+def generate_rules(chunk_text, pdf_sections=None, source_document=None, refine=True):
     """
-    Calls LLM for rule extraction, then enriches with category and metadata.
-    If a rule is too complex, re-extracts it using gpt-5.
+    Calls LLM for rule extraction, then enriches with category and metadata; returns a list
+    of Rule objects.
+    If a rule is too complex, re-extracts it using gpt-5 (see refine_complex_rules);
+    pass refine=False to leave that to the caller, e.g. to batch it across a document.
     pdf_sections should be a string (section heading) for this chunk.
+    Raises TruncatedOutputError, with the Rule objects that were extracted, when the chunk's
+    rules do not fit in the completion budget even after splitting.
     """
     # First pass: gpt-5-mini
-    rules = extract_rules_with_model(
-        chunk_text,
-        section_heading=pdf_sections,
-        source_document=source_document,
-        model="gpt-5-mini"
-    )
+    try:
+        rules = extract_rules_with_model(
+            chunk_text,
+            section_heading=pdf_sections,
+            source_document=source_document,
+            model=EXTRACTION_MODEL,
+        )
+    except TruncatedOutputError as e:
+        if refine:
+            e.rules = refine_complex_rules([e.rules], source_document=source_document)[0]
+        raise
 
     # Second pass: gpt-5 for complex rules
-    improved_rules = []
-    for rule in rules:
-        if is_complex_rule(rule):
-            print("Re-extracting complex rule with gpt-5...")
-            # Re-extract just this rule's text with gpt-5
-            single_rule_text = rule["rule_text"]
-            # Use the same prompt but with only the complex rule text
-            refined = extract_rules_with_model(
-                single_rule_text,
-                section_heading=rule.get("category", pdf_sections),
-                source_document=source_document,
-                model="gpt-5"
-            )
-            # If gpt-5 returns multiple rules, flatten them in place of the original
-            improved_rules.extend(refined)
-        else:
-            improved_rules.append(rule)
-    return json.dumps(improved_rules, indent=2)
\ No newline at end of file
+    if refine:
+        rules = refine_complex_rules([rules], source_document=source_document)[0]
+    return rules
+
+
+def generate_rule_json(chunk_text, pdf_sections=None, source_document=None, refine=True):
+    """generate_rules, returning the rules as an indented JSON string."""
+    return to_json(generate_rules(chunk_text, pdf_sections, source_document, refine), indent=2)
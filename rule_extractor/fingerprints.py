@@ -0,0 +1,75 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from .config import CACHE_DIR
+from .models import to_json
+from .results import pipeline_version
+
+
+class FingerprintIndex:
+    """
+    SQLite store of the rules extracted from each chunk of a source document, keyed by a
+    fingerprint of the chunk's headings and whitespace-normalised text. When a new revision
+    of a document is processed, chunks whose fingerprint is already stored can reuse their
+    rules (including rule_ids) instead of going back to the LLM. The fingerprint includes the
+    pipeline version, so rules from other prompts, models or chunk settings are not reused.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sections ("
+                "source_document TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+                "position INTEGER NOT NULL, rules TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (source_document, fingerprint))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def fingerprint(chunk):
+        text = re.sub(r"\s+", " ", chunk.text).strip()
+        payload = pipeline_version() + "\0" + "\n".join(chunk.headings) + "\0" + text
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, source_document):
+        """Return {fingerprint: rules JSON string} for the last stored revision of a document."""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT fingerprint, rules FROM sections WHERE source_document = ?",
+                    (source_document,),
+                )
+                .fetchall()
+            )
+        return dict(rows)
+
+    def replace(self, source_document, entries):
+        """Replace a document's stored chunks with entries, a list of (fingerprint, rules)."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM sections WHERE source_document = ?", (source_document,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO sections "
+                "(source_document, fingerprint, position, rules, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (source_document, fingerprint, position, to_json(rules, compact=True), now)
+                    for position, (fingerprint, rules) in enumerate(entries)
+                ],
+            )
+            conn.commit()
+
+
+fingerprint_index = FingerprintIndex(os.path.join(CACHE_DIR, "fingerprints.sqlite3"))
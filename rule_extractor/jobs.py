@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue already holds max_queued jobs."""
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue for the API. Jobs move through queued -> processing ->
+    success | failure, and survive restarts: jobs that were processing when the service
+    stopped are put back in the queue by requeue_interrupted(), up to max_attempts times.
+    """
+
+    def __init__(self, path, max_queued, max_attempts=3):
+        self.path = path
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, rule_count INTEGER, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at)"
+            )
+            # Databases created before job metrics were recorded lack the column
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "metrics" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN metrics TEXT")
+            self._conn.commit()
+        return self._conn
+
+    def enqueue(self, job_id, payload):
+        with self._lock:
+            conn = self._connect()
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({queued} jobs waiting).")
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(payload), time.time()),
+            )
+            conn.commit()
+
+    def claim(self):
+        """Mark the oldest queued job as processing and return (job_id, payload), or None."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'processing', attempts = attempts + 1, started_at = ? "
+                "WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+            conn.commit()
+            return row["id"], json.loads(row["payload"])
+
+    def finish(self, job_id, status, error=None, rule_count=None, metrics=None):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, rule_count = ?, metrics = ?, finished_at = ? "
+                "WHERE id = ?",
+                (
+                    status,
+                    error,
+                    rule_count,
+                    json.dumps(metrics) if metrics else None,
+                    time.time(),
+                    job_id,
+                ),
+            )
+            conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT id, status, attempts, error, rule_count, metrics, created_at, started_at, "
+                    "finished_at FROM jobs WHERE id = ?",
+                    (job_id,),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        job = dict(row)
+        job["metrics"] = json.loads(job["metrics"]) if job["metrics"] else None
+        return job
+
+    def requeue_interrupted(self):
+        """
+        Put jobs left in processing by a previous run back in the queue. Jobs that have already
+        been started max_attempts times, such as a document that crashes the process, are marked
+        as failed instead. Returns the number of jobs requeued and (job_id, payload, error) of
+        the failed ones.
+        """
+        with self._lock:
+            conn = self._connect()
+            abandoned = [
+                (row["id"], json.loads(row["payload"]), f"Interrupted {row['attempts']} times")
+                for row in conn.execute(
+                    "SELECT id, payload, attempts FROM jobs "
+                    "WHERE status = 'processing' AND attempts >= ?",
+                    (self.max_attempts,),
+                )
+            ]
+            conn.executemany(
+                "UPDATE jobs SET status = 'failure', error = ?, finished_at = ? WHERE id = ?",
+                [(error, time.time(), job_id) for job_id, _, error in abandoned],
+            )
+            count = conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'processing'"
+            ).rowcount
+            conn.commit()
+        return count, abandoned
+
+    def prune(self, older_than_seconds):
+        """Delete finished jobs older than older_than_seconds."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('success', 'failure') AND finished_at < ?",
+                (time.time() - older_than_seconds,),
+            )
+            conn.commit()
@@ -0,0 +1,54 @@
+import json
+
+
+class JsonArrayParser:
+    """
+    Incremental parser for a JSON array of objects arriving in pieces, such as a streamed
+    completion. feed() returns the objects completed by each piece, so everything before a
+    cut-off point is recovered even when the array itself is never closed. Text before the
+    opening bracket (a code fence, say) and after the closing one is ignored.
+    """
+
+    def __init__(self):
+        self.objects = []
+        self.started = False
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current = []
+
+    def feed(self, text):
+        """Consume the next piece of text and return the objects it completed."""
+        completed = []
+        for char in text:
+            if self.done:
+                break
+            if not self.started:
+                self.started = char == "["
+                continue
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._current = [char]
+                elif char == "]":
+                    self.done = True
+                continue
+            self._current.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(json.loads("".join(self._current)))
+        self.objects.extend(completed)
+        return completed
@@ -1,45 +1,437 @@
 import sys
 import json
 import os
+import copy
 import uuid
-from .utils import pdf_to_text
-from .chunk import chunk_text
-from .extractor import generate_rule_json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .utils import iter_pdf_pages
+from .chunk import iter_chunks, pack_chunks, split_text
+from .config import (
+    MAX_CONCURRENT_CHUNKS,
+    PACK_SECTIONS,
+    INCREMENTAL_EXTRACTION,
+    DEDUP_RULES,
+    CHUNK_MAX_ATTEMPTS,
+    CHUNK_MAX_SPLIT_DEPTH,
+)
+from .extractor import generate_rules, refine_complex_rules, TruncatedOutputError
+from .models import to_json, rules_from_json
+from .cache import llm_cache
+from .fingerprints import fingerprint_index
+from .checkpoints import chunk_checkpoints
+from .dedup import RuleDeduplicator, deduplicate_rules
+from .prefilter import should_extract
+from . import metrics
 
-def main(file_path):
-    print(f"Processing file: {file_path}")
-    
-    text = pdf_to_text(file_path)
-    chunks, pdf_sections = chunk_text(text, return_sections=True)
-    print(f"Document chunked into {len(chunks)} chunks.")
-    
+
+def _extract_chunk(chunk, section_heading, file_path, refine):
+    return generate_rules(
+        chunk, pdf_sections=section_heading, source_document=file_path, refine=refine
+    )
+
+
+def _extract_chunk_resilient(chunk, section_heading, file_path, refine, depth=0):
+    """
+    _extract_chunk with up to CHUNK_MAX_ATTEMPTS attempts. A chunk whose output keeps failing
+    to parse (a ValueError, such as invalid JSON) is split in two and the halves are
+    extracted on their own, up to CHUNK_MAX_SPLIT_DEPTH times; rules from the halves that
+    succeed are kept. Raises when nothing could be extracted, and straight away on API errors,
+    which the extractor has already retried. When the model's output was cut off more times
+    than the extractor splits a chunk for, TruncatedOutputError is raised with every rule
+    that was extracted.
+    """
+    for attempt in range(1, max(1, CHUNK_MAX_ATTEMPTS) + 1):
+        try:
+            return _extract_chunk(chunk, section_heading, file_path, refine)
+        except TruncatedOutputError:
+            # Already split CHUNK_MAX_SPLIT_DEPTH times; retrying would only cut it off again
+            raise
+        except ValueError as e:
+            error = e
+            print(f"Chunk extraction failed (attempt {attempt}/{CHUNK_MAX_ATTEMPTS}): {e}")
+    halves = split_text(chunk) if depth < CHUNK_MAX_SPLIT_DEPTH else None
+    if not halves:
+        raise error
+    print(f"Splitting failed chunk ({len(chunk)} characters) in two.")
+    rules = []
+    failures = 0
+    truncated = None
+    for half in halves:
+        try:
+            rules.extend(
+                _extract_chunk_resilient(half, section_heading, file_path, refine, depth + 1)
+            )
+        except TruncatedOutputError as e:
+            rules.extend(e.rules)
+            truncated = truncated or e
+        except ValueError as e:
+            failures += 1
+            error = e
+    if truncated:
+        raise TruncatedOutputError(str(truncated), rules)
+    if failures == len(halves):
+        raise error
+    return rules
+
+
+def _assign_rule_ids(rules):
+    # Reused rules keep the rule_id they were stored with
+    for rule in rules:
+        if not rule.rule_id:
+            rule.rule_id = str(uuid.uuid4())
+
+
+def _combine_chunk_rules(results):
+    """Concatenate {chunk index: rules} in chunk order, merging duplicates with DEDUP_RULES."""
     all_rules = []
-    for idx, chunk in enumerate(chunks):
-        print(f"Extracting rules from chunk {idx+1}/{len(chunks)}...")
-        section_heading = pdf_sections[idx] if pdf_sections and idx < len(pdf_sections) else "General"
-        rules_json = generate_rule_json(
-            chunk,
-            pdf_sections=section_heading,
-            source_document=file_path
+    for idx in sorted(results):
+        all_rules.extend(results[idx])
+    if DEDUP_RULES:
+        with metrics.span("dedup"):
+            count = len(all_rules)
+            all_rules = deduplicate_rules(all_rules)
+        print(f"Merged {count - len(all_rules)} duplicate rules.")
+    return all_rules
+
+
+def _extract_document(
+    file_path,
+    max_concurrency=None,
+    pack=None,
+    incremental=None,
+    on_chunk=None,
+    job_id=None,
+    failed_chunks=None,
+):
+    """
+    Pipeline shared by main() and stream_rules(). Returns {chunk index: rules} for the chunks
+    that succeeded, with complex rules refined across the whole document.
+    If on_chunk is given, each chunk is instead refined on its own and passed to
+    on_chunk(chunk_index, rules), with rule_ids assigned, as soon as it finishes; the rules are
+    then only kept when incremental needs them for the fingerprint index.
+    With a job_id, every finished chunk is checkpointed, and chunks checkpointed by an
+    earlier, interrupted run of the same job are not extracted again. Checkpoints are
+    cleared once every chunk is done, so resubmitting a job with failed chunks only
+    extracts those.
+    If failed_chunks is a list, the indexes of chunks that could not be extracted are
+    appended to it. So are chunks whose output was cut off (see TruncatedOutputError); the
+    rules they did yield are kept, but the chunk is neither checkpointed nor stored for
+    incremental runs, so it is extracted again next time.
+    Chunks without normative language (see prefilter.should_extract) are skipped and
+    recorded in the job metrics.
+    """
+    print(f"Processing file: {file_path}")
+
+    # Pages are read and chunked lazily, so the first chunks are already being
+    # extracted while the rest of the document is still being parsed
+    max_concurrency = max(1, max_concurrency or MAX_CONCURRENT_CHUNKS)
+    # Time spent waiting for chunks includes waiting for pages, so pdf_parsing is
+    # subtracted from chunking when they are recorded
+    pages = metrics.TimedIterator(iter_pdf_pages(file_path))
+    chunks = iter_chunks(pages)
+    if PACK_SECTIONS if pack is None else pack:
+        chunks = pack_chunks(chunks)
+    chunks = metrics.TimedIterator(chunks)
+    incremental = INCREMENTAL_EXTRACTION if incremental is None else incremental
+    streaming = on_chunk is not None
+    source_document = os.path.splitext(os.path.basename(file_path))[0]
+    previous = fingerprint_index.load(source_document) if incremental else {}
+    checkpoints = chunk_checkpoints.load(job_id) if job_id else {}
+    fingerprints = {}
+    results = {}
+    resumed = set()
+    incomplete = set()
+    errors = []
+
+    def completed(idx, rules, checkpoint=False):
+        if streaming:
+            _assign_rule_ids(rules)
+        if checkpoint and job_id:
+            chunk_checkpoints.save(job_id, idx, fingerprints[idx], rules)
+        if streaming:
+            on_chunk(idx, rules)
+        if not streaming or incremental:
+            results[idx] = rules
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {}
+        reused = 0
+        skipped = 0
+        for idx, chunk in enumerate(chunks):
+            fingerprints[idx] = fingerprint_index.fingerprint(chunk)
+            if idx in checkpoints and checkpoints[idx][0] == fingerprints[idx]:
+                completed(idx, rules_from_json(checkpoints[idx][1]))
+                resumed.add(idx)
+                continue
+            if fingerprints[idx] in previous:
+                completed(idx, rules_from_json(previous[fingerprints[idx]]))
+                reused += 1
+                continue
+            keep, score = should_extract(chunk.text)
+            metrics.record_prefilter(not keep, score, idx, chunk.heading)
+            if not keep:
+                skipped += 1
+                continue
+            # Workers run in a copy of this context so their LLM calls count towards the job
+            future = executor.submit(
+                contextvars.copy_context().run,
+                _extract_chunk_resilient,
+                chunk.text,
+                chunk.heading,
+                file_path,
+                streaming,
+            )
+            futures[future] = idx
+        metrics.record_stage("pdf_parsing", pages.seconds)
+        metrics.record_stage("chunking", chunks.seconds - pages.seconds)
+        total = len(fingerprints)
+        print(f"Document chunked into {total} chunks.")
+        if reused:
+            print(f"Reusing stored rules for {reused} unchanged chunks.")
+        if resumed:
+            print(f"Resuming job {job_id}: {len(resumed)} chunks already extracted.")
+        if skipped:
+            print(f"Skipping {skipped} chunks without normative language.")
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                rules = future.result()
+                print(f"Extracted rules from chunk {idx+1}/{total}.")
+            except TruncatedOutputError as e:
+                print(f"Chunk {idx+1}/{total} is incomplete, keeping {len(e.rules)} rules: {e}")
+                incomplete.add(idx)
+                if failed_chunks is not None:
+                    failed_chunks.append(idx)
+                completed(idx, e.rules)
+                continue
+            except Exception as e:
+                print(f"Error extracting rules from chunk {idx+1}/{total}: {e}")
+                errors.append(e)
+                if failed_chunks is not None:
+                    failed_chunks.append(idx)
+                continue
+            completed(idx, rules, checkpoint=True)
+
+    if futures and len(errors) == len(futures):
+        raise errors[0]
+
+    if not streaming:
+        # Second pass over the newly extracted and resumed chunks; reused chunks were refined
+        # when stored, and checkpoints hold first-pass rules
+        extracted = [idx for idx in futures.values() if idx in results] + sorted(resumed)
+        refined = refine_complex_rules(
+            [results[idx] for idx in extracted],
+            source_document=file_path,
+            max_concurrency=max_concurrency,
         )
-        rules = json.loads(rules_json)
-        all_rules.extend(rules)
-    
-    # Assign unique rule_id across all rules
-    for rule in all_rules:
-        rule["rule_id"] = str(uuid.uuid4())
-    
-    # Save combined output
-    out_file = file_path.rsplit(".", 1)[0] + "_rules.json"
+        results.update(zip(extracted, refined))
+        for idx in sorted(results):
+            _assign_rule_ids(results[idx])
+
+    if incremental:
+        # Chunks that failed or are incomplete are left out so the next run retries them
+        fingerprint_index.replace(
+            source_document,
+            [(fingerprints[idx], results[idx]) for idx in sorted(results) if idx not in incomplete],
+        )
+    if job_id and not errors and not incomplete:
+        chunk_checkpoints.clear(job_id)
+    print(f"LLM cache: {llm_cache.hits} hits, {llm_cache.misses} misses.")
+    return results
+
+
+def main(
+    file_path,
+    max_concurrency=None,
+    pack=None,
+    incremental=None,
+    job_id=None,
+    failed_chunks=None,
+    save_output=True,
+):
+    """
+    Extract rules from a PDF, sending up to max_concurrency chunks to the LLM at once, and
+    return them as a list of Rule objects. Unless save_output is False they are also
+    written to <file>_rules.json.
+    Short numbered sections are packed into larger chunks unless pack is False
+    (defaults to PACK_SECTIONS).
+    With incremental (defaults to INCREMENTAL_EXTRACTION), chunks unchanged since the last
+    run on a document of the same name reuse their stored rules and rule_ids, and only
+    added or changed chunks are sent to the LLM.
+    Rules keep the order of the chunks they came from. A chunk that fails is logged and
+    skipped so it does not take the other chunks down with it; the job only fails when
+    every chunk fails.
+    With DEDUP_RULES, duplicate and near-duplicate rules are merged into their first
+    occurrence (see dedup.RuleDeduplicator).
+    Passing a job_id checkpoints each finished chunk so a rerun of the same job after a crash
+    only extracts the chunks that are missing. Indexes of chunks that failed are appended to
+    failed_chunks when it is a list.
+    """
+    results = _extract_document(
+        file_path, max_concurrency, pack, incremental, job_id=job_id, failed_chunks=failed_chunks
+    )
+    all_rules = _combine_chunk_rules(results)
+
+    if save_output:
+        out_file = file_path.rsplit(".", 1)[0] + "_rules.json"
+        with open(out_file, "w") as f:
+            f.write(to_json(all_rules, indent=2))
+        print(f"Rule extraction completed. Output saved to {out_file}")
+    return all_rules
+
+
+def stream_rules(
+    file_path,
+    on_chunk=None,
+    max_concurrency=None,
+    pack=None,
+    incremental=None,
+    job_id=None,
+    failed_chunks=None,
+):
+    """
+    Streaming variant of main(). Rules are appended to <file>_rules.ndjson, one per line, as
+    each chunk finishes, and on_chunk(sequence, chunk_index, rules) is called for every
+    finished chunk with a sequence number counting up from 1. Chunks are emitted in the
+    order they finish and complex rules are refined per chunk rather than per document.
+    With DEDUP_RULES, duplicates of rules already emitted are dropped (they cannot be merged
+    into a rule that has already been sent).
+    Chunks are checkpointed under job_id, and failed chunks reported in failed_chunks, as in
+    main(); resumed chunks are emitted again with the rule_ids they were first sent with.
+    Returns a summary dict with output_file, rule_count, chunk_count and duplicate_count.
+    """
+    out_file = file_path.rsplit(".", 1)[0] + "_rules.ndjson"
+    summary = {"output_file": out_file, "rule_count": 0, "chunk_count": 0, "duplicate_count": 0}
+    deduplicator = RuleDeduplicator(merge=False) if DEDUP_RULES else None
     with open(out_file, "w") as f:
-        json.dump(all_rules, f, indent=2)
-    print(f"Rule extraction completed. Output saved to {out_file}")
-    
-    # Return the JSON string for API use
-    return json.dumps(all_rules, indent=2)
+
+        def emit(chunk_index, rules):
+            if deduplicator:
+                rules = [rule for rule in rules if deduplicator.add(rule) is None]
+                summary["duplicate_count"] = deduplicator.duplicates
+            for rule in rules:
+                f.write(to_json(rule) + "\n")
+            f.flush()
+            summary["chunk_count"] += 1
+            summary["rule_count"] += len(rules)
+            if on_chunk:
+                on_chunk(summary["chunk_count"], chunk_index, rules)
+
+        _extract_document(
+            file_path,
+            max_concurrency,
+            pack,
+            incremental,
+            on_chunk=emit,
+            job_id=job_id,
+            failed_chunks=failed_chunks,
+        )
+    print(f"Rule extraction completed. Output streamed to {out_file}")
+    return summary
+
+
+def extract_batch(file_paths, max_concurrency=None, pack=None):
+    """
+    Extract rules from several PDFs through one pool of up to max_concurrency LLM requests.
+    Chunks with the same fingerprint (headings and whitespace-normalised text), such as
+    boilerplate shared by related documents, are extracted and refined once and their rules
+    copied into every document that contains them, each copy with its own rule_id and
+    source_document. Returns {file_path: {"rules": [Rule, ...]}} or, for a document that could not
+    be read or whose chunks all failed, {file_path: {"error": "..."}}.
+    Chunks the pre-filter rejects are skipped as in main().
+    """
+    max_concurrency = max(1, max_concurrency or MAX_CONCURRENT_CHUNKS)
+    pack = PACK_SECTIONS if pack is None else pack
+    documents = {}
+    read_errors = {}
+    chunk_errors = {}
+    futures = {}
+    skipped = set()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for file_path in file_paths:
+            print(f"Processing file: {file_path}")
+            pages = metrics.TimedIterator(iter_pdf_pages(file_path))
+            chunks = iter_chunks(pages)
+            chunks = metrics.TimedIterator(pack_chunks(chunks) if pack else chunks)
+            fingerprints = documents[file_path] = []
+            try:
+                for idx, chunk in enumerate(chunks):
+                    fingerprint = fingerprint_index.fingerprint(chunk)
+                    fingerprints.append(fingerprint)
+                    if fingerprint in futures or fingerprint in skipped:
+                        continue
+                    keep, score = should_extract(chunk.text)
+                    metrics.record_prefilter(
+                        not keep, score, idx, chunk.heading, source_document=file_path
+                    )
+                    if not keep:
+                        skipped.add(fingerprint)
+                        continue
+                    futures[fingerprint] = executor.submit(
+                        contextvars.copy_context().run,
+                        _extract_chunk_resilient,
+                        chunk.text,
+                        chunk.heading,
+                        file_path,
+                        False,
+                    )
+            except Exception as e:
+                print(f"Error reading {file_path}: {e}")
+                read_errors[file_path] = e
+            metrics.record_stage("pdf_parsing", pages.seconds)
+            metrics.record_stage("chunking", chunks.seconds - pages.seconds)
+        total = sum(len(fingerprints) for fingerprints in documents.values())
+        print(
+            f"Batch of {len(file_paths)} documents chunked into {total} chunks, "
+            f"{len(futures) + len(skipped)} unique, {len(skipped)} skipped by the pre-filter."
+        )
+        extracted = {}
+        for fingerprint, future in futures.items():
+            try:
+                extracted[fingerprint] = future.result()
+            except TruncatedOutputError as e:
+                print(f"Chunk is incomplete, keeping {len(e.rules)} rules: {e}")
+                extracted[fingerprint] = e.rules
+            except Exception as e:
+                print(f"Error extracting rules from a chunk: {e}")
+                chunk_errors[fingerprint] = e
+
+    # Refine once per unique chunk, across the whole batch
+    unique = list(extracted)
+    refined = refine_complex_rules(
+        [extracted[fingerprint] for fingerprint in unique], max_concurrency=max_concurrency
+    )
+    extracted = dict(zip(unique, refined))
+
+    results = {}
+    for file_path, fingerprints in documents.items():
+        source_document = os.path.splitext(os.path.basename(file_path))[0]
+        chunk_rules = {}
+        for idx, fingerprint in enumerate(fingerprints):
+            if fingerprint in extracted:
+                chunk_rules[idx] = copy.deepcopy(extracted[fingerprint])
+                for rule in chunk_rules[idx]:
+                    rule.metadata["source_document"] = source_document
+                _assign_rule_ids(chunk_rules[idx])
+        if file_path in read_errors:
+            results[file_path] = {"error": str(read_errors[file_path])}
+        elif not chunk_rules and any(fingerprint in chunk_errors for fingerprint in fingerprints):
+            failed = next(
+                fingerprint for fingerprint in fingerprints if fingerprint in chunk_errors
+            )
+            results[file_path] = {"error": str(chunk_errors[failed])}
+        else:
+            results[file_path] = {"rules": _combine_chunk_rules(chunk_rules)}
+    print(f"LLM cache: {llm_cache.hits} hits, {llm_cache.misses} misses.")
+    return results
+
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python main.py <path-to-pdf>")
+        print("For many documents use python -m rule_extractor.batch")
     else:
-        main(sys.argv[1])
\ No newline at end of file
+        with metrics.job_metrics() as job:
+            main(sys.argv[1])
+        print(json.dumps(job.as_dict(), indent=2))
@@ -0,0 +1,269 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the duration histogram buckets
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Counter:
+    """Prometheus counter with optional labels."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram with optional labels; buckets are cumulative as in the exposition format."""
+
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(
+                key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(
+                        f"{self.name}_bucket{_labels(key + (('le', str(bound)),))} {count}"
+                    )
+                lines.append(
+                    f"{self.name}_bucket{_labels(key + (('le', '+Inf'),))} {series['count']}"
+                )
+                lines.append(f"{self.name}_sum{_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_labels(key)} {series['count']}")
+        return lines
+
+
+def _labels(key):
+    if not key:
+        return ""
+    pairs = []
+    for name, value in key:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+stage_seconds = Histogram("rule_extractor_stage_seconds", "Time spent per pipeline stage.")
+job_seconds = Histogram("rule_extractor_job_seconds", "End-to-end extraction job duration.")
+jobs_total = Counter("rule_extractor_jobs_total", "Extraction jobs by final status.")
+llm_calls_total = Counter(
+    "rule_extractor_llm_calls_total", "Chat completion requests that succeeded."
+)
+llm_errors_total = Counter(
+    "rule_extractor_llm_errors_total", "Chat completion attempts that failed."
+)
+llm_cache_hits_total = Counter(
+    "rule_extractor_llm_cache_hits_total", "LLM responses served from the cache."
+)
+llm_truncated_total = Counter(
+    "rule_extractor_llm_truncated_total", "Completions cut off at their token limit."
+)
+llm_tokens_total = Counter("rule_extractor_llm_tokens_total", "Tokens used by chat completions.")
+webhook_deliveries_total = Counter(
+    "rule_extractor_webhook_deliveries_total", "Webhook events by outcome."
+)
+prefilter_chunks_total = Counter(
+    "rule_extractor_prefilter_chunks_total", "Chunks by pre-filter decision."
+)
+
+REGISTRY = [
+    stage_seconds,
+    job_seconds,
+    jobs_total,
+    llm_calls_total,
+    llm_errors_total,
+    llm_cache_hits_total,
+    llm_truncated_total,
+    llm_tokens_total,
+    webhook_deliveries_total,
+    prefilter_chunks_total,
+]
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class JobMetrics:
+    """
+    Per-job accounting: time and count per stage, per model LLM calls, cache hits and
+    prompt/completion tokens, and the chunks the pre-filter kept and skipped. Safe to update
+    from the job's worker threads.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.llm = {}
+        self.prefilter = {"kept": 0, "skipped": 0, "skipped_chunks": []}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+
+    def add_llm(self, model, calls=0, cache_hits=0, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            entry = self.llm.setdefault(
+                model, {"calls": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            )
+            entry["calls"] += calls
+            entry["cache_hits"] += cache_hits
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+
+    def add_prefilter(self, skipped, chunk):
+        with self._lock:
+            if skipped:
+                self.prefilter["skipped"] += 1
+                self.prefilter["skipped_chunks"].append(chunk)
+            else:
+                self.prefilter["kept"] += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"count": entry["count"], "seconds": round(entry["seconds"], 3)}
+                    for stage, entry in self.stages.items()
+                },
+                "llm": {model: dict(entry) for model, entry in self.llm.items()},
+                "prefilter": {
+                    "kept": self.prefilter["kept"],
+                    "skipped": self.prefilter["skipped"],
+                    "skipped_chunks": [dict(chunk) for chunk in self.prefilter["skipped_chunks"]],
+                },
+            }
+
+
+# The job being processed. Worker threads only see it when they are started with
+# contextvars.copy_context().run, as the pipeline does.
+_current_job = contextvars.ContextVar("rule_extractor_job_metrics", default=None)
+
+
+@contextmanager
+def job_metrics():
+    """Collect metrics for everything run inside the block; yields the JobMetrics."""
+    metrics = JobMetrics()
+    token = _current_job.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_job.reset(token)
+
+
+def record_stage(stage, seconds):
+    stage_seconds.observe(seconds, stage=stage)
+    job = _current_job.get()
+    if job is not None:
+        job.add_stage(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time the block as one occurrence of stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+class TimedIterator:
+    """Wraps an iterator and adds up the time spent waiting for its items in seconds."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def record_llm_call(model, usage):
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    llm_calls_total.inc(model=model)
+    llm_tokens_total.inc(prompt_tokens, model=model, kind="prompt")
+    llm_tokens_total.inc(completion_tokens, model=model, kind="completion")
+    job = _current_job.get()
+    if job is not None:
+        job.add_llm(
+            model, calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        )
+
+
+def record_llm_error(model, error):
+    llm_errors_total.inc(model=model, error=type(error).__name__)
+
+
+def record_truncation(model):
+    llm_truncated_total.inc(model=model)
+
+
+def record_cache_hit(model):
+    llm_cache_hits_total.inc(model=model)
+    job = _current_job.get()
+    if job is not None:
+        job.add_llm(model, cache_hits=1)
+
+
+def record_prefilter(skipped, score, chunk_index, heading, source_document=None):
+    prefilter_chunks_total.inc(decision="skipped" if skipped else "kept")
+    job = _current_job.get()
+    if job is not None:
+        chunk = {"chunk_index": chunk_index, "heading": heading, "score": score}
+        if source_document is not None:
+            chunk["source_document"] = source_document
+        job.add_prefilter(skipped, chunk)
+
+
+def record_job(status, seconds):
+    jobs_total.inc(status=status)
+    job_seconds.observe(seconds, status=status)
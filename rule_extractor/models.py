@@ -0,0 +1,60 @@
+import json
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class Rule:
+    """
+    One extracted rule as it moves through the pipeline. Rules are passed between the
+    extractor, main() and the API as these objects and only turned into JSON at the edges:
+    output files, webhooks and the SQLite stores.
+    """
+
+    rule_text: str = ""
+    context: str = ""
+    tags: list = field(default_factory=list)
+    category: str = ""
+    metadata: dict = field(default_factory=dict)
+    rule_id: str = None
+
+    def to_dict(self):
+        data = {
+            "rule_text": self.rule_text,
+            "context": self.context,
+            "tags": self.tags,
+            "category": self.category,
+            "metadata": self.metadata,
+        }
+        if self.rule_id:
+            data["rule_id"] = self.rule_id
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            rule_text=data.get("rule_text", ""),
+            context=data.get("context", ""),
+            tags=list(data.get("tags", [])),
+            category=data.get("category", ""),
+            metadata=dict(data.get("metadata", {})),
+            rule_id=data.get("rule_id"),
+        )
+
+
+def _encode(obj):
+    if isinstance(obj, Rule):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_json(obj, indent=None, compact=False):
+    """Serialise obj, which may contain Rule objects anywhere, in one pass."""
+    separators = (",", ":") if compact else None
+    return json.dumps(
+        obj, ensure_ascii=False, indent=indent, separators=separators, default=_encode
+    )
+
+
+def rules_from_json(text):
+    """Parse a JSON list of rules, such as a stored chunk, into Rule objects."""
+    return [Rule.from_dict(data) for data in json.loads(text)]
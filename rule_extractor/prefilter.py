@@ -0,0 +1,135 @@
+"""
+Local pre-filter that keeps chunks without normative language (tables of contents, indexes,
+cover pages, copyright notices) away from the LLM.
+
+Scores can be checked against a labelled sample before changing PREFILTER_THRESHOLD:
+
+    python -m rule_extractor.prefilter score code.pdf > sample.jsonl
+    # add "has_rules": true/false to each line, then
+    python -m rule_extractor.prefilter tune sample.jsonl --min-recall 0.99
+"""
+
+import re
+import sys
+import json
+import argparse
+from .config import PREFILTER_THRESHOLD
+
+# Words and phrases that state an obligation, prohibition or permission. Each match adds 1
+# to a chunk's score.
+DEONTIC_PATTERN = re.compile(
+    r"\b(?:must|shall|should|may only|may not|cannot|can not|required?|requires|"
+    r"prohibited|forbidden|not (?:be )?(?:permitted|allowed)|obliged|obligated|mandatory|"
+    r"(?:is|are) responsible for|ensure[sd]?|(?:need|needs|have|has) to|do not|does not)\b",
+    re.IGNORECASE,
+)
+# Lines opening with a clause number such as "3.1", "(a)" or "iv)". Each adds
+# CLAUSE_WEIGHT, so a run of numbered clauses counts even when its wording is descriptive.
+CLAUSE_PATTERN = re.compile(r"^\s*(?:\d+(?:\.\d+)+|\(?[a-z]\)|\(?[ivx]{1,4}\))\s", re.MULTILINE)
+CLAUSE_WEIGHT = 0.25
+# Copyright and reproduction notices, whose "may not be reproduced" is not a rule
+BOILERPLATE_PATTERN = re.compile(
+    r"^.*(?:copyright|©|all rights reserved|no part of this (?:publication|document)).*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Table of contents and index entries: text followed by dot leaders or a page number
+TOC_LINE_PATTERN = re.compile(r"(?:\.{3,}|…|\s{2,})\s*\d{1,4}\s*$")
+
+
+def score_chunk(text):
+    """
+    Normative-language score of a chunk: the number of deontic markers plus CLAUSE_WEIGHT
+    per numbered clause line, scaled down by the share of lines that look like table of
+    contents entries. 0 means nothing in the chunk reads like a rule.
+    """
+    text = BOILERPLATE_PATTERN.sub("", text)
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return 0.0
+    toc_lines = sum(1 for line in lines if TOC_LINE_PATTERN.search(line))
+    score = len(DEONTIC_PATTERN.findall(text)) + CLAUSE_WEIGHT * len(CLAUSE_PATTERN.findall(text))
+    return round(score * (1 - toc_lines / len(lines)), 3)
+
+
+def should_extract(text, threshold=None):
+    """Return (keep, score) for a chunk; chunks scoring below threshold are skipped."""
+    threshold = PREFILTER_THRESHOLD if threshold is None else threshold
+    score = score_chunk(text)
+    return score >= threshold, score
+
+
+def tune(samples, min_recall=1.0):
+    """
+    For labelled samples ({"score" or "text", "has_rules"}), return rows of (threshold,
+    skipped fraction, recall), where recall is the share of chunks with rules that are kept,
+    and the highest threshold whose recall is at least min_recall.
+    """
+    scored = [
+        (
+            sample["score"] if "score" in sample else score_chunk(sample["text"]),
+            bool(sample["has_rules"]),
+        )
+        for sample in samples
+    ]
+    positives = sum(1 for _, has_rules in scored if has_rules) or 1
+    rows = []
+    best = 0.0
+    for threshold in sorted({0.0} | {score for score, _ in scored}):
+        skipped = sum(1 for score, _ in scored if score < threshold)
+        recall = (
+            sum(1 for score, has_rules in scored if has_rules and score >= threshold) / positives
+        )
+        rows.append((threshold, skipped / len(scored), recall))
+        if recall >= min_recall:
+            best = threshold
+    return rows, best
+
+
+def _score_documents(pdf_paths):
+    from .utils import iter_pdf_pages
+    from .chunk import iter_chunks, pack_chunks
+    from .config import PACK_SECTIONS
+
+    for pdf_path in pdf_paths:
+        chunks = iter_chunks(iter_pdf_pages(pdf_path))
+        if PACK_SECTIONS:
+            chunks = pack_chunks(chunks)
+        for idx, chunk in enumerate(chunks):
+            yield {
+                "source_document": pdf_path,
+                "chunk_index": idx,
+                "heading": chunk.heading,
+                "score": score_chunk(chunk.text),
+                "text": chunk.text,
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score chunks and tune the pre-filter threshold.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    score_parser = commands.add_parser(
+        "score", help="print each chunk of the PDFs with its score as JSONL"
+    )
+    score_parser.add_argument("pdfs", nargs="+")
+    tune_parser = commands.add_parser("tune", help="pick a threshold from a labelled JSONL sample")
+    tune_parser.add_argument("sample", help='JSONL lines with "text" or "score" and "has_rules"')
+    tune_parser.add_argument(
+        "--min-recall", type=float, default=1.0, help="share of chunks with rules that must be kept"
+    )
+    args = parser.parse_args()
+
+    if args.command == "score":
+        for record in _score_documents(args.pdfs):
+            print(json.dumps(record, ensure_ascii=False))
+    else:
+        with open(args.sample) as f:
+            samples = [json.loads(line) for line in f if line.strip()]
+        if not samples:
+            sys.exit("The sample is empty.")
+        rows, best = tune(samples, args.min_recall)
+        print(f"{'threshold':>10} {'skipped':>8} {'recall':>7}")
+        for threshold, skipped, recall in rows:
+            print(f"{threshold:>10.3f} {skipped:>8.1%} {recall:>7.1%}")
+        print(
+            f"Highest threshold with recall >= {args.min_recall:.0%}: {best:g} (current: {PREFILTER_THRESHOLD:g})"
+        )
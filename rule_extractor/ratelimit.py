@@ -0,0 +1,83 @@
+import time
+import threading
+
+
+def parse_rate_limits(spec, share=1.0):
+    """
+    Parse "model=rpm/tpm,model=rpm/tpm" into {model: (rpm, tpm)}, scaled by share for
+    processes that each get a part of the quota.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, quota = item.partition("=")
+        rpm, _, tpm = quota.partition("/")
+        limits[model.strip()] = (float(rpm) * share, float(tpm) * share)
+    return limits
+
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute. The level may go negative:
+    a request that overdraws it makes later requests wait until it has been paid back."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount, now):
+        """Take amount from the bucket and return how long the caller has to wait for it."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single request larger than the whole bucket still goes through once it is full
+        amount = min(amount, self.capacity)
+        wait = max(0.0, (amount - self.level) / self.rate)
+        self.level -= amount
+        return wait
+
+    def refund(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Per-model request and token buckets shared by every thread in the process,
+    so concurrent extraction runs at the quota ceiling instead of into 429s. Callers reserve
+    an estimate of prompt plus completion tokens up front, refund the difference once the
+    response reports its usage, and report Retry-After from throttled responses with pause().
+    """
+
+    def __init__(self, limits):
+        self._lock = threading.Lock()
+        self._buckets = {
+            model: (_Bucket(rpm), _Bucket(tpm)) for model, (rpm, tpm) in limits.items()
+        }
+        self._paused_until = {}
+
+    def _reserve(self, model, tokens):
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self._paused_until.get(model, 0.0) - now)
+            if model in self._buckets:
+                requests, token_bucket = self._buckets[model]
+                wait = max(wait, requests.reserve(1, now), token_bucket.reserve(tokens, now))
+        return wait
+
+    def acquire(self, model, tokens):
+        """Block the calling thread until a request of about `tokens` tokens may be sent."""
+        wait = self._reserve(model, tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def refund(self, model, tokens):
+        """Return tokens that were reserved but not used."""
+        if tokens <= 0 or model not in self._buckets:
+            return
+        with self._lock:
+            self._buckets[model][1].refund(tokens)
+
+    def pause(self, model, seconds):
+        """Hold back every request for model for the given number of seconds."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[model] = max(self._paused_until.get(model, 0.0), until)
@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from . import config
+from .config import CACHE_DIR, RESULT_CACHE_TTL_SECONDS
+from .models import to_json, rules_from_json
+
+# Settings that change what the pipeline produces for the same input; prompt files are
+# hashed as well
+_VERSIONED_SETTINGS = (
+    "EXTRACTION_MODEL",
+    "CLASSIFICATION_MODEL",
+    "REFINEMENT_MODEL",
+    "MAX_TOKENS_PER_CHUNK",
+    "EXTRACTION_COMPLETION_TOKENS",
+    "OVERLAP_TOKENS",
+    "PACK_SECTIONS",
+    "PACK_TOKENS_PER_CHUNK",
+    "REFINE_BATCH_SIZE",
+    "DEDUP_RULES",
+    "DEDUP_SIMILARITY",
+    "PREFILTER_THRESHOLD",
+)
+
+_pipeline_version = None
+
+
+def pipeline_version():
+    """Short hash of the prompts, models and chunking settings, computed once per process."""
+    global _pipeline_version
+    if _pipeline_version is None:
+        digest = hashlib.sha256()
+        prompts_dir = os.path.join(os.path.dirname(__file__), "prompts")
+        for name in sorted(os.listdir(prompts_dir)):
+            with open(os.path.join(prompts_dir, name), "rb") as f:
+                digest.update(name.encode("utf-8") + b"\0" + f.read() + b"\0")
+        settings = {name: getattr(config, name) for name in _VERSIONED_SETTINGS}
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        _pipeline_version = digest.hexdigest()[:16]
+    return _pipeline_version
+
+
+class DocumentResultCache:
+    """
+    SQLite cache of a whole document's extracted rules, keyed by the SHA-256 of the file's
+    bytes and the pipeline version, so resubmitting the same file skips the pipeline.
+    Entries expire after ttl_seconds; a ttl of 0 disables the cache.
+    """
+
+    def __init__(self, path, ttl_seconds=RESULT_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, rules TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(sha256):
+        return f"{sha256}:{pipeline_version()}"
+
+    def get(self, key):
+        """Return the cached Rule objects for key, or None."""
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT rules FROM results WHERE key = ? AND created_at >= ?",
+                    (key, time.time() - self.ttl_seconds),
+                )
+                .fetchone()
+            )
+        return rules_from_json(row[0]) if row else None
+
+    def set(self, key, rules):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, rules, created_at) VALUES (?, ?, ?)",
+                (key, to_json(rules, compact=True), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            conn.commit()
+
+
+result_cache = DocumentResultCache(os.path.join(CACHE_DIR, "results.sqlite3"))
@@ -0,0 +1,140 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from .config import RULE_INDEX_PATH
+from .models import to_json
+
+# bm25 weights for the rule_text, context and tags columns
+BM25_WEIGHTS = (1.0, 0.5, 2.0)
+BM25_RANK = f"bm25({', '.join(map(str, BM25_WEIGHTS))})"
+
+
+class RuleIndex:
+    """
+    SQLite store of extracted rules with an FTS5 full-text index over rule_text, context and
+    tags. Rules are upserted by rule_id as jobs finish and searched with bm25 ranking,
+    optionally filtered by category, source document or job.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS rules (
+                    id INTEGER PRIMARY KEY,
+                    rule_id TEXT NOT NULL UNIQUE,
+                    rule_text TEXT NOT NULL,
+                    context TEXT NOT NULL,
+                    tags TEXT NOT NULL,
+                    category TEXT,
+                    source_document TEXT,
+                    job_id TEXT,
+                    rule TEXT NOT NULL,
+                    indexed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS rules_category ON rules (category);
+                CREATE INDEX IF NOT EXISTS rules_source_document ON rules (source_document);
+                CREATE INDEX IF NOT EXISTS rules_job_id ON rules (job_id);
+                -- The full-text index stores no copy of the text; triggers keep it in step
+                CREATE VIRTUAL TABLE IF NOT EXISTS rules_fts USING fts5(
+                    rule_text, context, tags,
+                    content='rules', content_rowid='id', tokenize='porter unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS rules_ai AFTER INSERT ON rules BEGIN
+                    INSERT INTO rules_fts (rowid, rule_text, context, tags)
+                    VALUES (new.id, new.rule_text, new.context, new.tags);
+                END;
+                CREATE TRIGGER IF NOT EXISTS rules_ad AFTER DELETE ON rules BEGIN
+                    INSERT INTO rules_fts (rules_fts, rowid, rule_text, context, tags)
+                    VALUES ('delete', old.id, old.rule_text, old.context, old.tags);
+                END;
+                CREATE TRIGGER IF NOT EXISTS rules_au AFTER UPDATE ON rules BEGIN
+                    INSERT INTO rules_fts (rules_fts, rowid, rule_text, context, tags)
+                    VALUES ('delete', old.id, old.rule_text, old.context, old.tags);
+                    INSERT INTO rules_fts (rowid, rule_text, context, tags)
+                    VALUES (new.id, new.rule_text, new.context, new.tags);
+                END;
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def add(self, rules, job_id=None):
+        """Insert Rule objects, replacing any already stored under the same rule_id."""
+        now = time.time()
+        rows = [
+            (
+                rule.rule_id,
+                rule.rule_text,
+                rule.context,
+                " ".join(rule.tags),
+                rule.category or None,
+                rule.metadata.get("source_document"),
+                job_id,
+                to_json(rule, compact=True),
+                now,
+            )
+            for rule in rules
+            if rule.rule_id
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO rules (rule_id, rule_text, context, tags, category, source_document, "
+                "job_id, rule, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (rule_id) DO UPDATE SET rule_text = excluded.rule_text, "
+                "context = excluded.context, tags = excluded.tags, category = excluded.category, "
+                "source_document = excluded.source_document, job_id = excluded.job_id, "
+                "rule = excluded.rule, indexed_at = excluded.indexed_at",
+                rows,
+            )
+            conn.commit()
+        return len(rows)
+
+    def search(self, query, category=None, source_document=None, job_id=None, limit=20, offset=0):
+        """
+        Return up to limit (score, rule) pairs for rules matching any word of query, best
+        bm25 match over every query word first (higher scores are better).
+        """
+        words = re.findall(r"\w+", query or "")
+        if not words:
+            return []
+        # FTS5 ranks by its rank column itself, which is cheaper than sorting on bm25() calls
+        sql = (
+            "SELECT -rules_fts.rank AS score, rules.rule FROM rules_fts "
+            "JOIN rules ON rules.id = rules_fts.rowid "
+            "WHERE rules_fts MATCH ? AND rules_fts.rank MATCH ?"
+        )
+        params = [_match_expression(words), BM25_RANK]
+        for column, value in (
+            ("category", category),
+            ("source_document", source_document),
+            ("job_id", job_id),
+        ):
+            if value is not None:
+                sql += f" AND rules.{column} = ?"
+                params.append(value)
+        sql += " ORDER BY rules_fts.rank LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [(score, json.loads(rule)) for score, rule in rows]
+
+
+def _match_expression(words):
+    # Words are quoted so FTS5 operators and punctuation in user input are taken literally
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+rule_index = RuleIndex(RULE_INDEX_PATH)
@@ -1,9 +1,46 @@
-import fitz 
-
-def pdf_to_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    full_text = []
-    for page in doc:
-        text = page.get_text("text")
-        full_text.append(text)
-    return "\n".join(full_text)
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .config import PDF_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_SHARD_PAGES
+
+
+def iter_pdf_pages(pdf_path, workers=None):
+    """
+    Yield the text of each page in turn, without holding the whole document's text.
+    Large documents are extracted by a pool of worker processes, each handling
+    disjoint page ranges; pages are still yielded in document order.
+    """
+    import fitz  # imported on first use to keep module import cheap
+
+    workers = PDF_WORKERS if workers is None else workers
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            for page in doc:
+                yield page.get_text("text")
+            return
+    yield from _iter_pdf_pages_parallel(pdf_path, page_count, workers)
+
+
+def _iter_pdf_pages_parallel(pdf_path, page_count, workers):
+    # Shards are smaller than page_count / workers so the first pages arrive early
+    shard_pages = max(1, min(PDF_SHARD_PAGES, math.ceil(page_count / workers)))
+    starts = list(range(0, page_count, shard_pages))
+    stops = [min(start + shard_pages, page_count) for start in starts]
+    # Worker processes are not forked from this (possibly multi-threaded) process
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    context = multiprocessing.get_context(method)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for pages in pool.map(_extract_page_range, [pdf_path] * len(starts), starts, stops):
+            yield from pages
+
+
+def _extract_page_range(pdf_path, start, stop):
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text("text") for i in range(start, stop)]
+
+
+def pdf_to_text(pdf_path, workers=None):
+    return "\n".join(iter_pdf_pages(pdf_path, workers=workers))
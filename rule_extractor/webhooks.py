@@ -0,0 +1,216 @@
+import os
+import gzip
+import json
+import time
+import random
+import asyncio
+import threading
+import concurrent.futures
+from urllib.parse import urlsplit
+import httpx
+from . import metrics
+from .models import to_json
+from .config import (
+    WEBHOOK_MAX_ATTEMPTS,
+    WEBHOOK_PER_HOST_CONCURRENCY,
+    WEBHOOK_TIMEOUT_SECONDS,
+    WEBHOOK_DEAD_LETTER_PATH,
+    WEBHOOK_COMPACT_JSON,
+    WEBHOOK_GZIP,
+)
+
+# Client errors that are worth retrying; any other 4xx is final
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+# Fast enough for bodies with tens of thousands of rules and close to level 9 in size
+GZIP_LEVEL = 6
+
+
+def encode_payload(payload, compact=WEBHOOK_COMPACT_JSON, compress=WEBHOOK_GZIP):
+    """
+    Serialise a webhook payload, which may hold Rule objects, into a request body in one
+    pass. Returns (body bytes, headers); gzip bodies come with Content-Encoding: gzip.
+    """
+    body = to_json(payload, compact=compact).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if compress:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+class WebhookDispatcher:
+    """
+    Delivers webhooks in the background over one connection-pooled httpx.AsyncClient.
+    Failed deliveries are retried with exponential backoff (honouring Retry-After), at most
+    per_host_limit requests are in flight per receiving host, and events for the same job
+    are delivered in the order they were submitted. Events that still fail after
+    max_attempts are appended to a JSONL dead-letter file.
+    """
+
+    def __init__(
+        self,
+        max_attempts=WEBHOOK_MAX_ATTEMPTS,
+        per_host_limit=WEBHOOK_PER_HOST_CONCURRENCY,
+        timeout=WEBHOOK_TIMEOUT_SECONDS,
+        dead_letter_path=WEBHOOK_DEAD_LETTER_PATH,
+        base_delay=1.0,
+        max_delay=60.0,
+    ):
+        self.max_attempts = max_attempts
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.dead_letter_path = dead_letter_path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._loop = None
+        self._client = None
+        self._host_limits = {}
+        self._job_tails = {}
+        self._pending = set()
+        self._dead_letter_lock = threading.Lock()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+
+    async def stop(self, drain_timeout=10.0):
+        """Wait up to drain_timeout for pending deliveries, dead-letter the rest and close."""
+        if self._pending:
+            await asyncio.wait(set(self._pending), timeout=drain_timeout)
+        for task in list(self._pending):
+            task.cancel()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self._client.aclose()
+
+    def submit(self, url, body, headers=None, job_id=None):
+        """
+        Queue a webhook delivery without waiting for it. Safe to call from any thread.
+        Returns a concurrent.futures.Future that resolves to True once delivered, or False
+        once the event has been dead-lettered.
+        """
+        result = concurrent.futures.Future()
+
+        def schedule():
+            task = self._schedule(url, body, dict(headers or {}), job_id)
+            task.add_done_callback(
+                lambda t: result.set_result(False if t.cancelled() else t.result())
+            )
+
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            schedule()
+        else:
+            self._loop.call_soon_threadsafe(schedule)
+        return result
+
+    def _schedule(self, url, body, headers, job_id):
+        previous = self._job_tails.get(job_id) if job_id else None
+        task = self._loop.create_task(self._deliver_after(previous, url, body, headers))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        if job_id:
+            self._job_tails[job_id] = task
+            task.add_done_callback(lambda t: self._forget_job(job_id, t))
+        return task
+
+    def _forget_job(self, job_id, task):
+        if self._job_tails.get(job_id) is task:
+            del self._job_tails[job_id]
+
+    async def _deliver_after(self, previous, url, body, headers):
+        if previous is not None:
+            await asyncio.wait([previous])
+        return await self._deliver(url, body, headers)
+
+    async def _deliver(self, url, body, headers):
+        host = urlsplit(url).netloc
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        error = None
+        attempt = 0
+        started = time.perf_counter()
+        try:
+            while attempt < self.max_attempts:
+                attempt += 1
+                retry_after = None
+                async with limit:
+                    try:
+                        response = await self._client.post(url, content=body, headers=headers)
+                    except httpx.HTTPError as e:
+                        error = f"{type(e).__name__}: {e}"
+                    else:
+                        if response.status_code < 300:
+                            print(f"Webhook {headers.get('X-Event')} -> {response.status_code}")
+                            metrics.record_stage("webhook_delivery", time.perf_counter() - started)
+                            metrics.webhook_deliveries_total.inc(outcome="delivered")
+                            return True
+                        error = f"HTTP {response.status_code}"
+                        status = response.status_code
+                        if status < 500 and status not in RETRYABLE_STATUS_CODES:
+                            break
+                        retry_after = _parse_retry_after(response.headers.get("retry-after"))
+                if attempt < self.max_attempts:
+                    delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                    delay = (
+                        retry_after if retry_after is not None else delay * random.uniform(0.5, 1.0)
+                    )
+                    print(f"Webhook to {host} failed ({error}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(min(delay, self.max_delay))
+        except asyncio.CancelledError:
+            error = f"{error or 'not delivered'} (cancelled at shutdown)"
+            self._dead_letter(url, body, headers, error, attempt)
+            raise
+        self._dead_letter(url, body, headers, error, attempt)
+        return False
+
+    def _dead_letter(self, url, body, headers, error, attempts):
+        print(f"Webhook to {url} dead-lettered after {attempts} attempts: {error}")
+        metrics.webhook_deliveries_total.inc(outcome="dead_lettered")
+        if headers.get("Content-Encoding") == "gzip":
+            # Stored decompressed, without the header, so the file stays readable
+            body = gzip.decompress(body)
+            headers = {name: value for name, value in headers.items() if name != "Content-Encoding"}
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        record = {
+            "url": url,
+            "headers": headers,
+            "body": body,
+            "error": error,
+            "attempts": attempts,
+            "failed_at": time.time(),
+        }
+        with self._dead_letter_lock:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def start_dispatcher_thread(**kwargs):
+    """Run a WebhookDispatcher on its own event loop in a daemon thread and return it."""
+    dispatcher = WebhookDispatcher(**kwargs)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(dispatcher.start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="webhooks", daemon=True).start()
+    started.wait()
+    return dispatcher
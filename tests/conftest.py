@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+# The stores read their location when rule_extractor is imported, so tests get their own, and
+# the LLM response cache is off so extractions that run really reach the stub
+os.environ["RULE_EXTRACTOR_CACHE_DIR"] = tempfile.mkdtemp(prefix="rule_extractor_tests_")
+os.environ["LLM_CACHE_BYPASS"] = "1"
+
+import openai  # noqa: E402
+import pytest  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAI, serve  # noqa: E402
+from rule_extractor import extractor  # noqa: E402
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """benchmarks.fake_openai served locally, with the extractor's client pointed at it."""
+    fake = FakeOpenAI(latency=0.05, jitter=0.05)
+    server = serve(fake)
+    client = openai.OpenAI(
+        api_key="test", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", max_retries=0
+    )
+    monkeypatch.setattr(extractor, "_client", client)
+    yield fake
+    server.shutdown()
@@ -0,0 +1,96 @@
+import io
+import os
+import json
+from concurrent.futures import Future
+import pytest
+from rule_extractor import batch, extractor
+
+
+class InlineExecutor:
+    """ProcessPoolExecutor stand-in that records how it was set up and runs tasks in-process."""
+
+    created = []
+
+    def __init__(self, max_workers, initializer, initargs):
+        self.max_workers = max_workers
+        self.initargs = initargs
+        InlineExecutor.created.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    InlineExecutor.created = []
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(
+        batch, "_extract", lambda path: {"path": path, "status": "success", "rules": []}
+    )
+    return InlineExecutor
+
+
+def pdfs(tmp_path, count):
+    paths = []
+    for n in range(count):
+        path = tmp_path / f"doc{n}.pdf"
+        path.write_bytes(b"%PDF")
+        paths.append(str(path))
+    return paths
+
+
+def test_workers_and_quota_are_split_by_llm_concurrency(executor, tmp_path):
+    counts = batch.run_batch(pdfs(tmp_path, 10), io.StringIO(), workers=8, llm_concurrency=4)
+    assert counts["success"] == 10
+    (pool,) = executor.created
+    assert pool.max_workers == 4
+    assert pool.initargs == (1, 1 / 4, True)
+
+
+def test_no_more_workers_than_documents(executor, tmp_path):
+    batch.run_batch(pdfs(tmp_path, 2), io.StringIO(), workers=8, llm_concurrency=32)
+    (pool,) = executor.created
+    assert pool.max_workers == 2
+    assert pool.initargs == (16, 1 / 2, True)
+
+
+def test_up_to_date_documents_are_not_extracted(executor, tmp_path):
+    (pdf,) = pdfs(tmp_path, 1)
+    with open(batch.rules_path(pdf), "w") as f:
+        json.dump([{"rule_text": "Adverts must be legal."}], f)
+    os.utime(pdf, (0, 0))
+    output = io.StringIO()
+    assert batch.run_batch([pdf], output)["up_to_date"] == 1
+    assert executor.created == []
+    assert json.loads(output.getvalue())["status"] == "up_to_date"
+
+
+def test_worker_gets_its_share_of_the_rate_limits(monkeypatch):
+    monkeypatch.setattr(batch, "OPENAI_RATE_LIMITS", "gpt-5=100/40000")
+    monkeypatch.setattr(batch, "_max_concurrency", None)
+    monkeypatch.setattr(extractor, "rate_limiter", extractor.rate_limiter)
+    batch._init_worker(2, 1 / 4, quiet=False)
+    requests, tokens = extractor.rate_limiter._buckets["gpt-5"]
+    assert (requests.capacity, tokens.capacity) == (25, 10000)
+    assert batch._max_concurrency == 2
+
+
+def test_collect_pdfs_expands_directories_globs_and_manifests(tmp_path):
+    os.makedirs(tmp_path / "archive" / "2024")
+    nested = tmp_path / "archive" / "2024" / "a.pdf"
+    nested.write_bytes(b"%PDF")
+    loose = tmp_path / "b.pdf"
+    loose.write_bytes(b"%PDF")
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# listed documents\nb.pdf\n\narchive/2024/a.pdf\n")
+    expected = [str(nested), str(loose)]
+    assert batch.collect_pdfs([str(tmp_path / "archive")]) == [str(nested)]
+    assert batch.collect_pdfs([str(manifest), str(tmp_path / "*.pdf")]) == expected
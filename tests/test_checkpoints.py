@@ -0,0 +1,58 @@
+from benchmarks.synthetic import make_pdf
+from rule_extractor import main as pipeline
+from rule_extractor.checkpoints import ChunkCheckpoints, chunk_checkpoints
+from rule_extractor.models import Rule
+
+
+def test_checkpoints_are_kept_per_job_until_cleared(tmp_path):
+    checkpoints = ChunkCheckpoints(str(tmp_path / "checkpoints.sqlite3"))
+    rules = [Rule(rule_text="Adverts must be legal.", rule_id="r1")]
+    checkpoints.save("job-1", 0, "fp0", rules)
+    checkpoints.save("job-2", 0, "fp9", [])
+    assert list(checkpoints.load("job-1")) == [0]
+    assert checkpoints.load("job-1")[0][0] == "fp0"
+    checkpoints.clear("job-1")
+    assert checkpoints.load("job-1") == {}
+    assert list(checkpoints.load("job-2")) == [0]
+
+
+def test_prune_drops_old_checkpoints(tmp_path):
+    checkpoints = ChunkCheckpoints(str(tmp_path / "checkpoints.sqlite3"))
+    checkpoints.save("job-1", 0, "fp0", [])
+    checkpoints.prune(older_than_seconds=3600)
+    assert list(checkpoints.load("job-1")) == [0]
+    checkpoints.prune(older_than_seconds=-1)
+    assert checkpoints.load("job-1") == {}
+
+
+def test_resubmitted_job_only_extracts_the_chunks_that_failed(fake_openai, tmp_path, monkeypatch):
+    pdf = make_pdf(str(tmp_path / "resume.pdf"), pages=6, headings_per_page=6)
+    extract = pipeline._extract_chunk_resilient
+    extracted = []
+    down = True
+
+    def first_chunk_fails(chunk, *args):
+        extracted.append(chunk)
+        if down and chunk.startswith("1.1 "):
+            raise RuntimeError("API unavailable")
+        return extract(chunk, *args)
+
+    monkeypatch.setattr(pipeline, "_extract_chunk_resilient", first_chunk_fails)
+    failed_chunks = []
+    first = pipeline.main(
+        pdf, incremental=False, job_id="job-resume", failed_chunks=failed_chunks, save_output=False
+    )
+    assert failed_chunks == [0]
+    # Checkpoints survive a run with failed chunks, so only those are extracted again
+    assert sorted(chunk_checkpoints.load("job-resume")) == list(range(1, len(extracted)))
+
+    down = False
+    extracted.clear()
+    failed_chunks.clear()
+    second = pipeline.main(
+        pdf, incremental=False, job_id="job-resume", failed_chunks=failed_chunks, save_output=False
+    )
+    assert failed_chunks == []
+    assert len(extracted) == 1 and extracted[0].startswith("1.1 ")
+    assert len(second) > len(first)
+    assert chunk_checkpoints.load("job-resume") == {}
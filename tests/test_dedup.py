@@ -0,0 +1,57 @@
+from rule_extractor.dedup import deduplicate_rules
+from rule_extractor.models import Rule
+
+RULE = (
+    "Operators must ensure that every marketing communication sent by email or text message to a "
+    "customer identifies the operator clearly, states the terms of any bonus offer in full, and "
+    "is only sent with the customer's consent, which must be recorded before the customer opts in"
+)
+
+
+def rules(*texts):
+    return [Rule(rule_text=text, tags=[f"t{i}"], rule_id=str(i)) for i, text in enumerate(texts, 1)]
+
+
+def test_exact_duplicates_are_merged():
+    kept = deduplicate_rules(rules(RULE, RULE.upper() + "."))
+    assert len(kept) == 1
+    assert kept[0].metadata["merged_rule_ids"] == ["2"]
+    assert kept[0].tags == ["t1", "t2"]
+
+
+def test_near_duplicates_are_merged():
+    kept = deduplicate_rules(rules(RULE, RULE.replace("clearly", "plainly")))
+    assert [rule.rule_id for rule in kept] == ["1"]
+
+
+def test_negated_rule_is_kept():
+    kept = deduplicate_rules(rules(RULE, RULE.replace("must ensure", "must not ensure")))
+    assert [rule.rule_id for rule in kept] == ["1", "2"]
+
+
+def test_before_and_after_are_kept_apart():
+    kept = deduplicate_rules(rules(RULE, RULE.replace("before the customer", "after the customer")))
+    assert [rule.rule_id for rule in kept] == ["1", "2"]
+
+
+def test_different_modal_verb_is_kept():
+    kept = deduplicate_rules(rules(RULE, RULE.replace("Operators must", "Operators should")))
+    assert [rule.rule_id for rule in kept] == ["1", "2"]
+
+
+def test_different_numbers_are_kept():
+    text = RULE + " within 14 days"
+    kept = deduplicate_rules(rules(text, text.replace("14", "28")))
+    assert [rule.rule_id for rule in kept] == ["1", "2"]
+
+
+def test_all_variants_survive_together():
+    kept = deduplicate_rules(
+        rules(
+            RULE,
+            RULE.replace("must ensure", "must not ensure"),
+            RULE.replace("before the customer", "after the customer"),
+        )
+    )
+    assert len(kept) == 3
+    assert "merged_rule_ids" not in kept[0].metadata
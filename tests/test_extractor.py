@@ -0,0 +1,79 @@
+import json
+import re
+import pytest
+from rule_extractor import extractor
+from rule_extractor.extractor import (
+    TruncatedOutputError,
+    _extract_raw_rules,
+    _remaining_pieces,
+    _unprocessed_remainder,
+)
+from rule_extractor.jsonstream import JsonArrayParser
+
+CHUNK = (
+    "1.1 Marketers must not mislead consumers by omitting material information. "
+    "1.2 Claims must be supported by documentary evidence held at the time of publication. "
+    "1.3 Operators shall ensure that gambling advertisements are socially responsible."
+)
+
+
+def test_remainder_starts_after_last_extracted_rule():
+    rules = [
+        {"rule_text": "Marketers must not mislead consumers by omitting material information."},
+        {"rule_text": "Claims must be supported by documentary evidence held at the time"},
+    ]
+    assert _unprocessed_remainder(CHUNK, rules) == CHUNK[CHUNK.index("1.3") :]
+
+
+def test_remainder_uses_furthest_rule_regardless_of_order():
+    rules = [
+        {"rule_text": "Claims must be supported by documentary evidence"},
+        {"rule_text": "Marketers must not mislead consumers"},
+    ]
+    assert _unprocessed_remainder(CHUNK, rules).startswith("1.3 Operators")
+
+
+def test_remainder_is_whole_chunk_when_no_rule_is_found():
+    rules = [
+        {"rule_text": "Paraphrased beyond recognition by the model"},
+        {"rule_text": "Too short"},
+    ]
+    assert _unprocessed_remainder(CHUNK, rules) == CHUNK
+
+
+def test_remainder_is_empty_when_last_rule_ends_the_chunk():
+    rules = [
+        {
+            "rule_text": "Operators shall ensure that gambling advertisements are socially responsible."
+        }
+    ]
+    assert _unprocessed_remainder(CHUNK, rules) == ""
+
+
+def test_remaining_pieces_fail_past_split_depth(monkeypatch):
+    monkeypatch.setattr(extractor, "CHUNK_MAX_SPLIT_DEPTH", 1)
+    rules = [{"rule_text": "Marketers must not mislead consumers"}]
+    assert _remaining_pieces(CHUNK, rules, depth=0)
+    with pytest.raises(TruncatedOutputError) as raised:
+        _remaining_pieces(CHUNK, rules, depth=1)
+    assert raised.value.rules == rules
+
+
+def cut_off_after_first_clause(model, messages, max_completion_tokens):
+    """An answer with the rule of the first clause of the text, cut off before the next one."""
+    text = messages[-1]["content"].split("Text:\n", 1)[1].rsplit("\n\nOutput:", 1)[0]
+    first = re.match(r"\S+ (.+?\.)", text).group(1)
+    parser = JsonArrayParser()
+    parser.feed(json.dumps([{"rule_text": first}, {"rule_text": ""}])[:-20])
+    return parser, "length"
+
+
+def test_rules_from_every_piece_are_kept_when_output_is_cut_off(monkeypatch):
+    monkeypatch.setattr(extractor, "CHUNK_MAX_SPLIT_DEPTH", 1)
+    monkeypatch.setattr(extractor, "_stream_json_array", cut_off_after_first_clause)
+    with pytest.raises(TruncatedOutputError) as raised:
+        _extract_raw_rules("test-model", "Extract the rules.", CHUNK)
+    assert [rule["rule_text"] for rule in raised.value.rules] == [
+        "Marketers must not mislead consumers by omitting material information.",
+        "Claims must be supported by documentary evidence held at the time of publication.",
+    ]
@@ -0,0 +1,56 @@
+import os
+from benchmarks.synthetic import make_pdf
+from rule_extractor import fingerprints
+from rule_extractor.chunk import Chunk
+from rule_extractor.fingerprints import FingerprintIndex
+from rule_extractor.main import main
+from rule_extractor.models import Rule, rules_from_json
+
+
+def chunk(text, headings=("1. Advertising",)):
+    return Chunk(text, headings[0], list(headings), len(text.split()))
+
+
+def test_fingerprint_ignores_whitespace():
+    assert FingerprintIndex.fingerprint(
+        chunk("Adverts must  be\nlegal.")
+    ) == FingerprintIndex.fingerprint(chunk(" Adverts must be legal. "))
+
+
+def test_fingerprint_depends_on_headings_and_text():
+    base = FingerprintIndex.fingerprint(chunk("Adverts must be legal."))
+    assert FingerprintIndex.fingerprint(chunk("Adverts must not be legal.")) != base
+    assert FingerprintIndex.fingerprint(chunk("Adverts must be legal.", ("2. Gambling",))) != base
+
+
+def test_fingerprint_changes_with_pipeline_version(monkeypatch):
+    before = FingerprintIndex.fingerprint(chunk("Adverts must be legal."))
+    monkeypatch.setattr(fingerprints, "pipeline_version", lambda: "another-version")
+    assert FingerprintIndex.fingerprint(chunk("Adverts must be legal.")) != before
+
+
+def test_replace_keeps_only_the_latest_revision(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "fingerprints.sqlite3"))
+    kept = [Rule(rule_text="Adverts must be legal.", rule_id="r1")]
+    index.replace("doc", [("a", [Rule(rule_text="Old rule.", rule_id="r0")]), ("b", kept)])
+    index.replace("doc", [("b", kept)])
+    stored = index.load("doc")
+    assert list(stored) == ["b"]
+    assert rules_from_json(stored["b"]) == kept
+    assert index.load("other") == {}
+
+
+def test_new_revision_only_extracts_changed_chunks(fake_openai, tmp_path):
+    os.makedirs(tmp_path / "v1")
+    os.makedirs(tmp_path / "v2")
+    # Same document name, so the second revision is diffed against the first
+    first = make_pdf(str(tmp_path / "v1" / "policy.pdf"), pages=6, headings_per_page=6)
+    second = make_pdf(str(tmp_path / "v2" / "policy.pdf"), pages=7, headings_per_page=6)
+    before = main(first, incremental=True, save_output=False)
+    calls = fake_openai.stats()["calls"]["gpt-5-mini"]
+
+    fake_openai.reset()
+    after = main(second, incremental=True, save_output=False)
+    assert 0 < fake_openai.stats()["calls"]["gpt-5-mini"] < calls
+    reused = {rule.rule_id for rule in before} & {rule.rule_id for rule in after}
+    assert reused
@@ -0,0 +1,29 @@
+from benchmarks.synthetic import make_pdf
+from rule_extractor import extractor
+from rule_extractor.main import main
+from rule_extractor.models import to_json
+
+
+def test_rerun_of_unchanged_document_reuses_every_chunk(fake_openai, tmp_path):
+    pdf = make_pdf(str(tmp_path / "unchanged.pdf"), pages=40, headings_per_page=8)
+    first = main(pdf, max_concurrency=2, incremental=True, save_output=False)
+    assert sum(fake_openai.stats()["calls"].values()) > 0
+
+    fake_openai.reset()
+    second = main(pdf, max_concurrency=2, incremental=True, save_output=False)
+    assert fake_openai.stats()["calls"] == {}
+    assert to_json(second) == to_json(first)
+
+
+def test_cut_off_chunk_keeps_its_rules_and_is_extracted_again(fake_openai, tmp_path, monkeypatch):
+    monkeypatch.setattr(extractor, "EXTRACTION_COMPLETION_TOKENS", 300)
+    monkeypatch.setattr(extractor, "CHUNK_MAX_SPLIT_DEPTH", 0)
+    pdf = make_pdf(str(tmp_path / "dense.pdf"), pages=2, headings_per_page=8)
+    failed_chunks = []
+    rules = main(pdf, incremental=True, failed_chunks=failed_chunks, save_output=False)
+    assert failed_chunks
+    assert rules
+
+    fake_openai.reset()
+    main(pdf, incremental=True, save_output=False)
+    assert fake_openai.stats()["calls"].get("gpt-5-mini", 0) >= len(failed_chunks)
@@ -0,0 +1,40 @@
+import pytest
+from rule_extractor.jobs import JobQueue, QueueFullError
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_queued=2, max_attempts=2)
+
+
+def test_jobs_are_claimed_oldest_first(queue):
+    queue.enqueue("a", {"file_url": "a.pdf"})
+    queue.enqueue("b", {"file_url": "b.pdf"})
+    assert queue.claim() == ("a", {"file_url": "a.pdf"})
+    assert queue.get("a")["status"] == "processing"
+    queue.finish("a", "success", rule_count=3)
+    assert queue.get("a")["rule_count"] == 3
+    assert queue.claim()[0] == "b"
+    assert queue.claim() is None
+
+
+def test_enqueue_fails_when_queue_is_full(queue):
+    queue.enqueue("a", {})
+    queue.enqueue("b", {})
+    with pytest.raises(QueueFullError):
+        queue.enqueue("c", {})
+
+
+def test_interrupted_job_is_requeued_until_max_attempts(queue):
+    queue.enqueue("a", {"file_url": "a.pdf"})
+    queue.claim()
+    assert queue.requeue_interrupted() == (1, [])
+    assert queue.get("a")["status"] == "queued"
+
+    queue.claim()
+    count, abandoned = queue.requeue_interrupted()
+    assert count == 0
+    assert abandoned == [("a", {"file_url": "a.pdf"}, "Interrupted 2 times")]
+    job = queue.get("a")
+    assert (job["status"], job["error"]) == ("failure", "Interrupted 2 times")
+    assert queue.claim() is None
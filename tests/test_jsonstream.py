@@ -0,0 +1,46 @@
+from rule_extractor.jsonstream import JsonArrayParser
+
+
+def feed_in_pieces(text, size):
+    parser = JsonArrayParser()
+    for start in range(0, len(text), size):
+        parser.feed(text[start : start + size])
+    return parser
+
+
+def test_objects_split_across_pieces():
+    parser = feed_in_pieces('[{"rule_text": "a"}, {"rule_text": "b", "tags": ["x", "y"]}]', 3)
+    assert parser.objects == [{"rule_text": "a"}, {"rule_text": "b", "tags": ["x", "y"]}]
+    assert parser.done
+
+
+def test_feed_returns_only_newly_completed_objects():
+    parser = JsonArrayParser()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(": 2}]") == [{"b": 2}]
+
+
+def test_code_fence_is_ignored():
+    parser = feed_in_pieces('```json\n[{"rule_text": "a"}]\n```', 5)
+    assert parser.objects == [{"rule_text": "a"}]
+    assert parser.done
+
+
+def test_brackets_and_quotes_inside_strings():
+    text = r'[{"rule_text": "see [1] and {note}", "context": "a \"quoted\" ] part\\"}]'
+    parser = feed_in_pieces(text, 4)
+    assert parser.objects == [{"rule_text": "see [1] and {note}", "context": 'a "quoted" ] part\\'}]
+    assert parser.done
+
+
+def test_cut_off_keeps_completed_objects():
+    parser = feed_in_pieces('[{"rule_text": "a"}, {"rule_text": "b"}, {"rule_text": "c', 7)
+    assert parser.objects == [{"rule_text": "a"}, {"rule_text": "b"}]
+    assert parser.started
+    assert not parser.done
+
+
+def test_text_without_array():
+    parser = feed_in_pieces("I could not find any rules.", 4)
+    assert parser.objects == []
+    assert not parser.started
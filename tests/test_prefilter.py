@@ -0,0 +1,44 @@
+import pytest
+from rule_extractor.prefilter import score_chunk, should_extract, tune
+
+
+def test_rules_score_above_contents_and_notices():
+    rules = "3.1 Marketers must not mislead consumers.\n3.2 Claims shall be substantiated."
+    contents = "Introduction ........ 1\nMarketing communications ........ 4\nGambling ..... 12"
+    notice = (
+        "Copyright 2024. All rights reserved. No part of this publication may not be reproduced."
+    )
+    assert score_chunk(rules) == pytest.approx(2.5)
+    assert score_chunk(contents) == 0
+    assert score_chunk(notice) == 0
+    assert score_chunk("") == 0
+
+
+def test_should_extract_uses_threshold():
+    text = "Operators should keep records."
+    assert should_extract(text, threshold=1) == (True, 1.0)
+    assert should_extract(text, threshold=1.5) == (False, 1.0)
+
+
+def test_tune_picks_highest_threshold_with_enough_recall():
+    samples = [
+        {"score": 0.0, "has_rules": False},
+        {"score": 0.5, "has_rules": True},
+        {"score": 1.0, "has_rules": False},
+        {"score": 2.0, "has_rules": True},
+        {"score": 3.0, "has_rules": True},
+    ]
+    rows, best = tune(samples, min_recall=1.0)
+    assert best == 0.5
+    assert rows[0] == (0.0, 0.0, 1.0)
+    assert rows[-1] == (3.0, 0.8, pytest.approx(1 / 3))
+
+    _, best = tune(samples, min_recall=0.6)
+    assert best == 2.0
+
+
+def test_tune_scores_text_samples_and_handles_no_positives():
+    samples = [{"text": "Contents ........ 3", "has_rules": False}]
+    rows, best = tune(samples)
+    assert rows == [(0.0, 0.0, 0.0)]
+    assert best == 0.0
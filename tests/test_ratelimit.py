@@ -0,0 +1,61 @@
+import pytest
+from rule_extractor.ratelimit import RateLimiter, _Bucket, parse_rate_limits
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("gpt-5-mini=600/120000, gpt-5=60/30000,") == {
+        "gpt-5-mini": (600.0, 120000.0),
+        "gpt-5": (60.0, 30000.0),
+    }
+    assert parse_rate_limits("") == {}
+
+
+def test_bucket_waits_only_once_empty():
+    bucket = _Bucket(60)
+    bucket.updated = 0.0
+    assert bucket.reserve(60, now=0.0) == 0
+    # One unit per second comes back
+    assert bucket.reserve(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.reserve(1, now=0.0) == pytest.approx(2.0)
+
+
+def test_bucket_refills_up_to_capacity():
+    bucket = _Bucket(60)
+    bucket.updated = 0.0
+    bucket.reserve(30, now=0.0)
+    assert bucket.reserve(0, now=10.0) == 0
+    assert bucket.level == pytest.approx(40)
+    bucket.reserve(0, now=1000.0)
+    assert bucket.level == 60
+
+
+def test_oversized_request_goes_through_once_the_bucket_is_full():
+    bucket = _Bucket(60)
+    bucket.updated = 0.0
+    assert bucket.reserve(500, now=0.0) == 0
+    assert bucket.level == 0
+
+
+def test_overdraft_is_paid_back_before_the_next_request():
+    bucket = _Bucket(60)
+    bucket.updated = 0.0
+    bucket.reserve(50, now=0.0)
+    assert bucket.reserve(30, now=0.0) == pytest.approx(20.0)
+    assert bucket.reserve(1, now=0.0) == pytest.approx(21.0)
+
+
+def test_refund_is_capped_at_capacity():
+    bucket = _Bucket(60)
+    bucket.updated = 0.0
+    bucket.reserve(10, now=0.0)
+    bucket.refund(100)
+    assert bucket.level == 60
+
+
+def test_limiter_waits_for_pause_and_ignores_unknown_models():
+    limiter = RateLimiter({"gpt-5": (60, 1000)})
+    assert limiter._reserve("gpt-5", 100) == 0
+    assert limiter._reserve("other-model", 10**9) == 0
+    limiter.pause("gpt-5", 30)
+    assert limiter._reserve("gpt-5", 100) == pytest.approx(30, abs=1)
+    assert limiter._reserve("other-model", 100) == 0
@@ -0,0 +1,47 @@
+from rule_extractor import results
+from rule_extractor.app import _own_copy
+from rule_extractor.models import Rule
+from rule_extractor.results import DocumentResultCache
+
+
+def rules():
+    return [
+        Rule(rule_text="Adverts must be legal.", metadata={"source_document": "a"}, rule_id="r1")
+    ]
+
+
+def test_cached_rules_round_trip(tmp_path):
+    cache = DocumentResultCache(str(tmp_path / "results.sqlite3"), ttl_seconds=60)
+    key = DocumentResultCache.key("abc")
+    assert cache.get(key) is None
+    cache.set(key, rules())
+    assert cache.get(key) == rules()
+
+
+def test_key_changes_with_pipeline_version(monkeypatch):
+    before = DocumentResultCache.key("abc")
+    monkeypatch.setattr(results, "pipeline_version", lambda: "another-version")
+    assert DocumentResultCache.key("abc") != before
+
+
+def test_expired_and_disabled_entries_are_not_returned(tmp_path, monkeypatch):
+    cache = DocumentResultCache(str(tmp_path / "results.sqlite3"), ttl_seconds=60)
+    cache.set("key", rules())
+    now = results.time.time()
+    monkeypatch.setattr(results.time, "time", lambda: now + 61)
+    assert cache.get("key") is None
+
+    disabled = DocumentResultCache(str(tmp_path / "disabled.sqlite3"), ttl_seconds=0)
+    disabled.set("key", rules())
+    assert disabled.get("key") is None
+
+
+def test_own_copy_gives_each_job_its_own_rules():
+    shared = rules()
+    copy = _own_copy(shared)
+    assert [rule.rule_text for rule in copy] == [rule.rule_text for rule in shared]
+    assert copy[0].rule_id not in (None, "r1")
+    assert _own_copy(shared)[0].rule_id != copy[0].rule_id
+    copy[0].metadata["source_document"] = "b"
+    assert shared[0].metadata["source_document"] == "a"
+    assert shared[0].rule_id == "r1"
@@ -0,0 +1,45 @@
+from rule_extractor.models import Rule
+from rule_extractor.rule_index import RuleIndex
+
+
+def make_index(tmp_path, texts):
+    index = RuleIndex(str(tmp_path / "rules.sqlite3"))
+    index.add(
+        [
+            Rule(rule_text=text, category="Marketing", rule_id=str(i))
+            for i, text in enumerate(texts)
+        ],
+        job_id="job",
+    )
+    return index
+
+
+def ids(results):
+    return [rule["rule_id"] for _, rule in results]
+
+
+def test_every_query_word_counts_towards_the_ranking(tmp_path):
+    # "gambling" is in every rule, so only the ranking can tell them apart
+    texts = [f"Gambling operators must keep record {i}." for i in range(50)]
+    texts.append("Gambling advertising must not target minors.")
+    index = make_index(tmp_path, texts)
+    assert ids(index.search("gambling advertising"))[0] == "50"
+
+
+def test_common_words_alone_are_still_ranked(tmp_path):
+    texts = [f"Gambling operators must keep record {i}." for i in range(50)]
+    texts.insert(10, "Gambling must be gambling responsible gambling.")
+    index = make_index(tmp_path, texts)
+    results = index.search("gambling")
+    assert ids(results)[0] == "10"
+    scores = [score for score, _ in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_filters_and_paging(tmp_path):
+    index = make_index(tmp_path, [f"Operators must verify age {i}." for i in range(30)])
+    first, second = index.search("verify", limit=20), index.search("verify", limit=20, offset=20)
+    assert len(first) == 20 and len(second) == 10
+    assert not set(ids(first)) & set(ids(second))
+    assert index.search("verify", category="Legal") == []
+    assert len(index.search("verify", job_id="job", limit=100)) == 30
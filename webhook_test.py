@@ -5,6 +5,7 @@ Run this, then use the ngrok URL as your webhook_url in Bruno
 """
 
 from flask import Flask, request, jsonify
+import gzip
 import json
 from datetime import datetime
 
@@ -17,8 +18,11 @@ def webhook_receiver():
         # Get headers
         headers = dict(request.headers)
         
-        # Get JSON payload
-        payload = request.get_json()
+        # Get JSON payload (gzip-encoded when the API runs with WEBHOOK_GZIP)
+        body = request.get_data()
+        if request.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        payload = json.loads(body)
         
         # Print formatted webhook info
         print("\n" + "="*50)